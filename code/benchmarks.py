@@ -0,0 +1,189 @@
+"""This file contains benchmarks for code used in "Think Stats",
+by Allen B. Downey, available from greenteapress.com
+
+Copyright 2014 Allen B. Downey
+License: GNU GPLv3 http://www.gnu.org/licenses/gpl.html
+"""
+
+from __future__ import print_function, division
+
+import sys
+import timeit
+
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+import hypothesis
+import survival
+import thinkstats2
+
+
+def Time(func, number=3):
+    """Runs a function several times and returns the best time.
+
+    func: function with no arguments
+    number: how many times to run it
+
+    returns: float seconds
+    """
+    return min(timeit.repeat(func, number=1, repeat=number))
+
+
+def PrintTimes(label, baseline, fast):
+    """Prints two times and the speedup.
+
+    label: string
+    baseline: float seconds
+    fast: float seconds
+    """
+    print(
+        "%-30s %8.3f s %8.3f s %6.1fx"
+        % (label, baseline, fast, baseline / fast)
+    )
+
+
+def BenchmarkReadFixedWidth(
+    dct_file="2002FemPreg.dct", dat_file="2002FemPreg.dat.gz", usecols=None
+):
+    """Compares ReadFixedWidth with ReadFixedWidthFast.
+
+    dct_file: string file name
+    dat_file: string file name
+    usecols: list of variable names for the column-pruned comparison
+    """
+    if usecols is None:
+        usecols = [
+            "caseid",
+            "outcome",
+            "birthord",
+            "prglngth",
+            "birthwgt_lb",
+            "birthwgt_oz",
+            "agepreg",
+            "finalwgt",
+        ]
+
+    dct = thinkstats2.ReadStataDct(dct_file)
+    print(dat_file, "%d variables" % len(dct.variables))
+    print("%-30s %10s %10s %7s" % ("", "read_fwf", "fast", "speedup"))
+
+    fwf = Time(lambda: dct.ReadFixedWidth(dat_file, compression="gzip"))
+    fast = Time(lambda: dct.ReadFixedWidthFast(dat_file))
+    PrintTimes("all columns", fwf, fast)
+
+    fwf = Time(
+        lambda: dct.ReadFixedWidth(
+            dat_file, compression="gzip", usecols=usecols
+        )
+    )
+    fast = Time(lambda: dct.ReadFixedWidthFast(dat_file, usecols=usecols))
+    PrintTimes("%d columns" % len(usecols), fwf, fast)
+
+    df1 = dct.ReadFixedWidth(dat_file, compression="gzip", usecols=usecols)
+    df2 = dct.ReadFixedWidthFast(dat_file, usecols=usecols)
+    mem1 = df1.memory_usage(deep=True).sum()
+    mem2 = df2.memory_usage(deep=True).sum()
+    print(
+        "%-30s %8.1f MB %7.1f MB"
+        % ("memory, %d columns" % len(usecols), mem1 / 1e6, mem2 / 1e6)
+    )
+
+
+def EstimateHazardLoop(complete, ongoing):
+    """Kaplan-Meier with Counters and a loop over the times.
+
+    This is how survival.EstimateHazardFunction used to work; it is
+    here as a baseline.
+
+    complete: list of complete lifetimes
+    ongoing: list of ongoing lifetimes
+
+    returns: Series that maps from time to hazard
+    """
+    hist_complete = Counter(complete)
+    hist_ongoing = Counter(ongoing)
+
+    ts = sorted(hist_complete | hist_ongoing)
+    at_risk = len(complete) + len(ongoing)
+
+    lams = pd.Series(index=ts, dtype=float)
+    for t in ts:
+        ended = hist_complete[t]
+        censored = hist_ongoing[t]
+        lams[t] = ended / at_risk
+        at_risk -= ended + censored
+
+    return lams
+
+
+def BenchmarkKaplanMeier(n=100000, seed=17):
+    """Compares Kaplan-Meier estimators on durations with many ties.
+
+    n: number of lifetimes
+    seed: random seed
+    """
+    rng = np.random.default_rng(seed)
+    durations = np.round(rng.exponential(10, size=n), 3)
+    ended = rng.random(n) < 0.7
+    complete = list(durations[ended])
+    ongoing = list(durations[~ended])
+    print(
+        "Kaplan-Meier, %d lifetimes, %d distinct"
+        % (n, len(np.unique(durations)))
+    )
+    print("%-30s %10s %10s %7s" % ("", "baseline", "fast", "speedup"))
+
+    loop = Time(lambda: EstimateHazardLoop(complete, ongoing), number=1)
+    fast = Time(lambda: survival.EstimateHazardFunction(complete, ongoing))
+    PrintTimes("loop vs EstimateHazardFunction", loop, fast)
+
+    numpy = Time(lambda: survival.EstimateHazardNumpy(complete, ongoing))
+    fast = Time(lambda: survival.KaplanMeier(durations, ended))
+    PrintTimes("EstimateHazardNumpy vs KM", numpy, fast)
+
+    weights = rng.uniform(0.5, 2, size=n)
+    entries = rng.uniform(0, 5, size=n) * (rng.random(n) < 0.2)
+    fast = Time(
+        lambda: survival.KaplanMeier(durations, ended, weights, entries)
+    )
+    print("%-30s %21.3f s" % ("KM, weights and truncation", fast))
+
+
+def BenchmarkPermutation(sizes=(100, 1000, 9000), iters=1000, seed=17):
+    """Compares the permutation tests with their batched versions.
+
+    sizes: sequence of sample sizes
+    iters: number of permutations
+    seed: random seed
+    """
+    rng = np.random.default_rng(seed)
+    print("Permutation tests, %d iterations" % iters)
+    print("%-30s %10s %10s %7s" % ("", "baseline", "batch", "speedup"))
+
+    for n in sizes:
+        xs = rng.normal(0, 1, n)
+        ys = 0.1 * xs + rng.normal(0, 1, n)
+
+        data = np.round(xs), np.round(ys)
+        loop = Time(lambda: hypothesis.DiffMeansPermute(data).PValue(iters))
+        ht = hypothesis.DiffMeansPermuteBatch(data)
+        fast = Time(lambda: ht.PValue(iters, seed=seed))
+        PrintTimes("DiffMeansPermute, n=%d" % n, loop, fast)
+
+        data = xs, ys
+        loop = Time(lambda: hypothesis.CorrelationPermute(data).PValue(iters))
+        ht = hypothesis.CorrelationPermuteBatch(data)
+        fast = Time(lambda: ht.PValue(iters, seed=seed))
+        PrintTimes("CorrelationPermute, n=%d" % n, loop, fast)
+
+
+def main(script, *args):
+    BenchmarkReadFixedWidth()
+    BenchmarkKaplanMeier()
+    BenchmarkPermutation()
+
+
+if __name__ == "__main__":
+    main(*sys.argv)
@@ -41,28 +41,23 @@ def CleanBrfssFrame(df):
     df: DataFrame
     """
     # clean age
-    df.age.replace([7, 9], float('NaN'), inplace=True)
+    df['age'] = df.age.replace([7, 9], np.nan)
 
     # clean height
-    df.htm3.replace([999], float('NaN'), inplace=True)
+    df['htm3'] = df.htm3.replace([999], np.nan)
 
     # clean weight
-    df.wtkg2.replace([99999], float('NaN'), inplace=True)
-    df.wtkg2 /= 100.0
+    df['wtkg2'] = df.wtkg2.replace([99999], np.nan) / 100.0
 
     # clean weight a year ago
-    df.wtyrago.replace([7777, 9999], float('NaN'), inplace=True)
-    df['wtyrago'] = df.wtyrago.apply(lambda x: x/2.2 if x < 9000 else x-9000)
+    wtyrago = df.wtyrago.replace([7777, 9999], np.nan).values
+    df['wtyrago'] = np.where(wtyrago < 9000, wtyrago / 2.2, wtyrago - 9000)
 
 
-def ReadBrfss(filename='CDBRFS08.ASC.gz', compression='gzip', nrows=None):
-    """Reads the BRFSS data.
-
-    filename: string
-    compression: string
-    nrows: int number of rows to read, or None for all
+def MakeBrfssVariables():
+    """Makes the FixedWidthVariables for the BRFSS columns we use.
 
-    returns: DataFrame
+    returns: FixedWidthVariables
     """
     var_info = [
         ('age', 101, 102, int),
@@ -75,13 +70,140 @@ def ReadBrfss(filename='CDBRFS08.ASC.gz', compression='gzip', nrows=None):
     columns = ['name', 'start', 'end', 'type']
     variables = pandas.DataFrame(var_info, columns=columns)
     variables.end += 1
-    dct = thinkstats2.FixedWidthVariables(variables, index_base=1)
+    return thinkstats2.FixedWidthVariables(variables, index_base=1)
+
+
+def ReadBrfss(filename='CDBRFS08.ASC.gz', compression='gzip', nrows=None,
+              cache_dir=None):
+    """Reads the BRFSS data.
+
+    filename: string
+    compression: string
+    nrows: int number of rows to read, or None for all
+    cache_dir: string directory for a thinkstats2.FrameCache, or None
+
+    returns: DataFrame
+    """
+    if cache_dir is not None:
+        cache = thinkstats2.FrameCache(cache_dir)
+        return cache.Read(ReadBrfss, [filename],
+                          args=(filename, compression, nrows),
+                          depends=[CleanBrfssFrame, MakeBrfssVariables])
 
+    dct = MakeBrfssVariables()
     df = dct.ReadFixedWidth(filename, compression=compression, nrows=nrows)
     CleanBrfssFrame(df)
     return df
 
 
+def ReadBrfssChunks(filename='CDBRFS08.ASC.gz', compression='gzip',
+                    chunksize=100000, nrows=None):
+    """Reads the BRFSS data in chunks.
+
+    filename: string
+    compression: string
+    chunksize: int number of rows per chunk
+    nrows: int number of rows to read, or None for all
+
+    returns: iterator of cleaned DataFrames
+    """
+    dct = MakeBrfssVariables()
+    reader = dct.ReadFixedWidth(filename, compression=compression,
+                                nrows=nrows, chunksize=chunksize)
+    for df in reader:
+        CleanBrfssFrame(df)
+        yield df
+
+
+class BrfssSummary(object):
+    """Summary of BRFSS columns accumulated one chunk at a time.
+
+    For each column, keeps a Hist, with array storage, and a
+    RunningMeanVar for all respondents, males and females.  Memory use
+    depends on the number of distinct values, not the number of rows.
+    """
+
+    groups = ['all', 'male', 'female']
+
+    def __init__(self, columns=('htm3', 'wtkg2', 'wtyrago')):
+        """Initializes.
+
+        columns: sequence of column names
+        """
+        self.columns = list(columns)
+        self.hists = {}
+        self.stats = {}
+        for column in self.columns:
+            self.hists[column] = thinkstats2.Hist(label=column, array=True)
+            for group in self.groups:
+                self.stats[column, group] = thinkstats2.RunningMeanVar()
+
+    def Update(self, df):
+        """Adds a chunk of cleaned data.
+
+        df: DataFrame
+        """
+        male = (df.sex == 1).values
+        female = (df.sex == 2).values
+        for column in self.columns:
+            values = df[column].values.astype(float)
+            self.hists[column].Update(values[~np.isnan(values)])
+            self.stats[column, 'all'].Update(values)
+            self.stats[column, 'male'].Update(values[male])
+            self.stats[column, 'female'].Update(values[female])
+
+    def Merge(self, other):
+        """Adds the data summarized by another BrfssSummary.
+
+        other: BrfssSummary with the same columns
+        """
+        for column in self.columns:
+            self.hists[column].Merge(other.hists[column])
+            for group in self.groups:
+                self.stats[column, group].Merge(other.stats[column, group])
+
+    def MakeCdf(self, column):
+        """Makes the Cdf of a column.
+
+        column: string column name
+
+        returns: Cdf
+        """
+        return thinkstats2.Cdf(self.hists[column], label=column)
+
+    def Print(self, column, title):
+        """Prints summary statistics like Summarize.
+
+        column: string column name
+        title: string
+        """
+        print(title)
+        print('key\tn\tmean\tvar\tstd\tcv')
+        for group in self.groups:
+            stat = self.stats[column, group]
+            mean, var = stat.MeanVar(ddof=1)
+            std = math.sqrt(var)
+            cv = std / mean
+            t = group, stat.n, mean, var, std, cv
+            print('%s\t%d\t%4.2f\t%4.2f\t%4.2f\t%4.4f' % t)
+
+
+def SummarizeBrfssChunks(chunks, columns=('htm3', 'wtkg2', 'wtyrago')):
+    """Reduces a sequence of cleaned chunks to a BrfssSummary.
+
+    Only one chunk is held in memory at a time.
+
+    chunks: iterator of DataFrames, like ReadBrfssChunks
+    columns: sequence of column names
+
+    returns: BrfssSummary
+    """
+    summary = BrfssSummary(columns)
+    for df in chunks:
+        summary.Update(df)
+    return summary
+
+
 def MakeNormalModel(weights):
     """Plots a CDF with a Normal model.
 
@@ -160,6 +282,10 @@ def main(script, nrows=1000):
     Summarize(df, 'wtkg2', 'Weight (kg):')
     Summarize(df, 'wtyrago', 'Weight year ago (kg):')
 
+    chunks = ReadBrfssChunks(nrows=nrows, chunksize=max(nrows // 4, 1))
+    summary = SummarizeBrfssChunks(chunks)
+    summary.Print('wtkg2', 'Weight (kg), streamed:')
+
     if nrows == 1000:
         assert(df.age.value_counts()[40] == 28)
         assert(df.sex.value_counts()[2] == 668)
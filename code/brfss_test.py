@@ -0,0 +1,123 @@
+"""This file contains code for use with "Think Stats",
+by Allen B. Downey, available from greenteapress.com
+
+Copyright 2014 Allen B. Downey
+License: GNU GPLv3 http://www.gnu.org/licenses/gpl.html
+"""
+
+from __future__ import print_function, division
+
+import gzip
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas
+
+import brfss
+import thinkstats2
+
+
+def MakeRows(n, seed=17):
+    """Makes random BRFSS-like rows, including the special values.
+
+    n: number of rows
+    seed: random seed
+
+    returns: DataFrame with the raw codes
+    """
+    rng = np.random.default_rng(seed)
+    wtyrago = rng.choice([120, 160, 215, 7777, 9999, 9070, 9085], n)
+    return pandas.DataFrame(dict(
+        age=rng.choice([7, 9, 25, 40, 63], n),
+        sex=rng.choice([1, 2], n),
+        wtyrago=wtyrago,
+        finalwt=rng.integers(1, 10**6, n),
+        wtkg2=rng.choice([5455, 9091, 7273, 99999], n),
+        htm3=rng.choice([163, 178, 999], n),
+    ))
+
+
+def WriteFixedWidth(filename, raw):
+    """Writes rows to a gzipped fixed-width file at the BRFSS positions.
+
+    filename: string
+    raw: DataFrame like MakeRows
+    """
+    variables = brfss.MakeBrfssVariables().variables
+    with gzip.open(filename, 'wt') as f:
+        for _, row in raw.iterrows():
+            line = [' '] * 1258
+            for _, var in variables.iterrows():
+                start, end = var.start - 1, var.end - 1
+                line[start:end] = str(row[var['name']]).rjust(end - start)
+            f.write(''.join(line) + '\n')
+
+
+def CleanBrfssFrameLoop(df):
+    """Recodes BRFSS variables one value at a time, like the original.
+
+    df: DataFrame
+    """
+    df['age'] = df.age.replace([7, 9], float('NaN'))
+    df['htm3'] = df.htm3.replace([999], float('NaN'))
+    df['wtkg2'] = df.wtkg2.replace([99999], float('NaN')) / 100.0
+    wtyrago = df.wtyrago.replace([7777, 9999], float('NaN'))
+    df['wtyrago'] = wtyrago.apply(lambda x: x/2.2 if x < 9000 else x-9000)
+
+
+class Test(unittest.TestCase):
+
+    def testCleanBrfssFrame(self):
+        raw = MakeRows(500)
+        df1 = raw.copy()
+        brfss.CleanBrfssFrame(df1)
+        df2 = raw.copy()
+        CleanBrfssFrameLoop(df2)
+
+        for column in raw.columns:
+            self.assertTrue(np.allclose(df1[column], df2[column],
+                                        equal_nan=True))
+        self.assertEqual(df1.wtyrago.isnull().sum(),
+                         raw.wtyrago.isin([7777, 9999]).sum())
+        self.assertTrue(np.allclose(df1.wtyrago[raw.wtyrago == 9070], 70))
+
+    def testSummarizeBrfssChunks(self):
+        raw = MakeRows(500)
+        with tempfile.TemporaryDirectory() as dirname:
+            filename = os.path.join(dirname, 'brfss.ASC.gz')
+            WriteFixedWidth(filename, raw)
+            df = brfss.ReadBrfss(filename)
+            chunks = list(brfss.ReadBrfssChunks(filename, chunksize=120))
+
+        self.assertEqual(len(chunks), 5)
+        pandas.testing.assert_frame_equal(
+            pandas.concat(chunks, ignore_index=True), df)
+        self.assertTrue((df.finalwt == raw.finalwt).all())
+
+        summary = brfss.SummarizeBrfssChunks(iter(chunks))
+        groups = dict(all=df, male=df[df.sex == 1], female=df[df.sex == 2])
+        for column in summary.columns:
+            hist = thinkstats2.Hist(df[column].dropna())
+            self.assertEqual(dict(summary.hists[column].Items()),
+                             dict(hist.Items()))
+            for group, frame in groups.items():
+                series = frame[column].dropna()
+                stat = summary.stats[column, group]
+                mean, var = stat.MeanVar(ddof=1)
+                self.assertEqual(stat.n, len(series))
+                self.assertAlmostEqual(mean, series.mean())
+                self.assertAlmostEqual(var, series.var())
+
+        # summaries of separate parts merge into the summary of the whole
+        part1 = brfss.SummarizeBrfssChunks(chunks[:2])
+        part1.Merge(brfss.SummarizeBrfssChunks(chunks[2:]))
+        stat1 = part1.stats['wtkg2', 'female']
+        stat2 = summary.stats['wtkg2', 'female']
+        self.assertTrue(np.allclose(stat1.MeanVar(), stat2.MeanVar()))
+        self.assertEqual(part1.hists['htm3'], summary.hists['htm3'])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -122,6 +122,132 @@ class CorrelationPermute(thinkstats2.HypothesisTest):
         return xs, ys
 
 
+def _BatchRng():
+    """Makes a NumPy Generator seeded from the global np.random state.
+
+    That way thinkstats2.RandomSeed, and the seeded chunks in
+    HypothesisTest.PValue, make the batched tests reproducible.
+    """
+    return np.random.default_rng(np.random.randint(2**63, dtype=np.int64))
+
+
+class DiffMeansPermuteBatch(DiffMeansPermute):
+    """Tests a difference in means with blocks of permutations.
+
+    The test statistic depends only on the sum of the first group, so
+    RunModelBatch returns an array of group sums.  When the pool has
+    few distinct values, the counts of each value in the first group
+    are drawn from a multivariate hypergeometric distribution, which
+    costs one draw per distinct value rather than one per element.
+    Otherwise each row of a block of random keys selects a random subset
+    with argpartition.
+
+    max_bytes bounds the memory used by one block.
+    """
+
+    max_bytes = 2**27
+
+    def MakeModel(self):
+        """Build a model of the null hypothesis.
+        """
+        DiffMeansPermute.MakeModel(self)
+        self.total = self.pool.sum()
+        self.values, self.counts = np.unique(self.pool, return_counts=True)
+
+        size = len(self.pool)
+        self.use_counts = len(self.values) <= size / 10
+        if self.use_counts:
+            bytes_per_iter = 8 * len(self.values)
+        else:
+            bytes_per_iter = 20 * size
+        self.batch_size = max(1, self.max_bytes // bytes_per_iter)
+
+    def TestStatistic(self, data):
+        """Computes the test statistic.
+
+        Uses the same arithmetic as TestStatisticBatch, so for integer
+        data, ties between the actual and simulated statistics are exact.
+
+        data: pair of sequences
+        """
+        group1, group2 = data
+        sum1, sum2 = np.sum(group1), np.sum(group2)
+        return abs(sum1 / len(group1) - sum2 / len(group2))
+
+    def RunModelBatch(self, n):
+        """Run the model of the null hypothesis n times.
+
+        returns: array of sums of the first group
+        """
+        rng = _BatchRng()
+
+        # draw whichever group is smaller
+        k = min(self.n, self.m)
+        if self.use_counts:
+            counts = rng.multivariate_hypergeometric(self.counts, k, size=n)
+            sums = counts @ self.values
+        else:
+            keys = rng.random((n, len(self.pool)), dtype=np.float32)
+            indices = np.argpartition(keys, k-1, axis=1)[:, :k]
+            sums = self.pool[indices].sum(axis=1)
+
+        return sums if k == self.n else self.total - sums
+
+    def TestStatisticBatch(self, sums):
+        """Computes the test statistic for an array of group sums.
+
+        sums: array of sums of the first group
+
+        returns: array of absolute differences in means
+        """
+        return abs(sums / self.n - (self.total - sums) / self.m)
+
+
+class CorrelationPermuteBatch(CorrelationPermute):
+    """Tests correlations with blocks of permutations.
+
+    Standardizes xs and ys once, then computes the correlations for a
+    block of permuted xs as one matrix-vector product.  That saves the
+    per-iteration overhead, which dominates for small samples (about
+    10x faster than CorrelationPermute with 100 pairs; see
+    benchmarks.BenchmarkPermutation).  For thousands of pairs,
+    generating the permutations dominates and the two run at about the
+    same speed; use PValue with processes instead.
+
+    max_bytes bounds the memory used by one block.
+    """
+
+    max_bytes = 2**27
+
+    def MakeModel(self):
+        """Build a model of the null hypothesis.
+        """
+        xs, ys = self.data
+        xs = np.asarray(xs, dtype=float)
+        ys = np.asarray(ys, dtype=float)
+        self.zxs = (xs - xs.mean()) / xs.std()
+        self.zys = (ys - ys.mean()) / ys.std() / len(ys)
+        self.batch_size = max(1, self.max_bytes // (8 * len(xs)))
+
+    def RunModelBatch(self, n):
+        """Run the model of the null hypothesis n times.
+
+        returns: matrix with one permutation of the standardized xs per row
+        """
+        rng = _BatchRng()
+        block = np.broadcast_to(self.zxs, (n, len(self.zxs)))
+        return rng.permuted(block, axis=1)
+
+    def TestStatisticBatch(self, batch):
+        """Computes the test statistic for a block of permutations.
+
+        batch: matrix of permuted standardized xs
+
+        returns: array of absolute correlations
+        """
+        return abs(batch @ self.zys)
+
+
 class DiceTest(thinkstats2.HypothesisTest):
     """Tests whether a six-sided die is fair."""
 
@@ -220,11 +346,13 @@ def RunDiceTest():
     print('dice chi test', dt.PValue(iters=10000))
 
 
-def FalseNegRate(data, num_runs=1000):
+def FalseNegRate(data, num_runs=1000, adaptive=False):
     """Computes the chance of a false negative based on resampling.
 
     data: pair of sequences
     num_runs: how many experiments to simulate
+    adaptive: boolean, whether to stop each test early once its p-value
+              is clearly above or below 0.05 (see PValueAdaptive)
 
     returns: float false negative rate
     """
@@ -235,7 +363,11 @@ def FalseNegRate(data, num_runs=1000):
         sample1 = thinkstats2.Resample(group1)
         sample2 = thinkstats2.Resample(group2)
         ht = DiffMeansPermute((sample1, sample2))
-        p_value = ht.PValue(iters=101)
+        if adaptive:
+            p_value = ht.PValueAdaptive(alpha=0.05, min_iters=25,
+                                        max_iters=101)
+        else:
+            p_value = ht.PValue(iters=101)
         if p_value > 0.05:
             count += 1
 
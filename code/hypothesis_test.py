@@ -0,0 +1,65 @@
+"""This file contains code for use with "Think Stats",
+by Allen B. Downey, available from greenteapress.com
+
+Copyright 2014 Allen B. Downey
+License: GNU GPLv3 http://www.gnu.org/licenses/gpl.html
+"""
+
+from __future__ import print_function, division
+
+import unittest
+import numpy as np
+
+import hypothesis
+import thinkstats2
+
+
+class Test(unittest.TestCase):
+
+    def testDiffMeansPermuteBatch(self):
+        rng = np.random.default_rng(17)
+
+        # few distinct values uses the hypergeometric counts;
+        # many distinct values uses argpartition
+        for group1, group2 in [
+                (rng.integers(0, 5, 300), rng.integers(0, 5, 200) + 0.2),
+                (rng.normal(0, 1, 300), rng.normal(0.15, 1, 200))]:
+            thinkstats2.RandomSeed(17)
+            p1 = hypothesis.DiffMeansPermute((group1, group2)).PValue(2000)
+
+            ht = hypothesis.DiffMeansPermuteBatch((group1, group2))
+            p2 = ht.PValue(2000, seed=1)
+            self.assertEqual(len(ht.test_stats), 2000)
+            self.assertAlmostEqual(p1, p2, delta=0.04)
+
+        self.assertFalse(ht.use_counts)
+
+        # the statistic comes from both groups, whatever the pool is
+        ht = hypothesis.DiffMeansPermuteBatch(([1, 2, 3], [5, 7]))
+        self.assertEqual(ht.TestStatistic(([1, 2], [6])), 4.5)
+        self.assertTrue(np.allclose(ht.TestStatisticBatch(np.array([6])),
+                                    ht.TestStatistic(([1, 2, 3], [5, 7]))))
+        ht = hypothesis.DiffMeansPermuteBatch((group1.round(), group2.round()))
+        self.assertTrue(ht.use_counts)
+
+    def testCorrelationPermuteBatch(self):
+        rng = np.random.default_rng(17)
+        xs = rng.normal(0, 1, 200)
+        ys = 0.12 * xs + rng.normal(0, 1, 200)
+
+        thinkstats2.RandomSeed(17)
+        p1 = hypothesis.CorrelationPermute((xs, ys)).PValue(2000)
+
+        ht = hypothesis.CorrelationPermuteBatch((xs, ys))
+        ht.batch_size = 300
+        p2 = ht.PValue(2000, seed=1)
+        self.assertEqual(len(ht.test_stats), 2000)
+        self.assertAlmostEqual(p1, p2, delta=0.04)
+
+        batch = ht.RunModelBatch(3)
+        self.assertEqual(batch.shape, (3, 200))
+        self.assertTrue(np.allclose(np.sort(batch[0]), np.sort(ht.zxs)))
+
+
+if __name__ == "__main__":
+    unittest.main()
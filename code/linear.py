@@ -36,15 +36,8 @@ def SamplingDistributions(live, iters=101):
 
     returns: pair of sequences (inters, slopes)
     """
-    t = []
-    for _ in range(iters):
-        sample = thinkstats2.ResampleRows(live)
-        ages = sample.agepreg
-        weights = sample.totalwgt_lb
-        estimates = thinkstats2.LeastSquares(ages, weights)
-        t.append(estimates)
-
-    inters, slopes = zip(*t)
+    bootstrap = thinkstats2.Bootstrap(live, iters)
+    inters, slopes = bootstrap.LeastSquares('agepreg', 'totalwgt_lb')
     return inters, slopes
 
 
@@ -220,34 +213,37 @@ class SlopeTest(thinkstats2.HypothesisTest):
 def ResampleRowsWeighted(df, attr='finalwgt'):
     """Resamples a DataFrame using probabilities proportional to finalwgt.
 
+    To draw many resamples, make a thinkstats2.WeightedResampler once
+    and call its Resample method.
+
     df: DataFrame
     attr: string column name to use as weights
 
     returns: DataFrame
     """
-    weights = df[attr]
-    cdf = thinkstats2.Pmf(weights).MakeCdf()
-    indices = cdf.Sample(len(weights))
-    sample = df.loc[indices]
-    return sample
+    resampler = thinkstats2.WeightedResampler(df, attr)
+    return resampler.Resample()
 
 
-def EstimateBirthWeight(live, iters=1001):
+def EstimateBirthWeight(live, iters=1001, method='resample'):
     """Estimate mean birth weight by resampling, with and without weights.
 
     live: DataFrame
     iters: number of experiments to run
+    method: 'resample', or 'poisson' or 'bayes' to reweight the rows
+            instead (see thinkstats2.Bootstrap)
     """
 
     mean = live.totalwgt_lb.mean()
     print('mean', mean)
 
-    estimates = [thinkstats2.ResampleRows(live).totalwgt_lb.mean()
-                 for _ in range(iters)]
+    bootstrap = thinkstats2.Bootstrap(live, iters, method=method)
+    estimates = bootstrap.Mean('totalwgt_lb')
     Summarize(estimates)
 
-    estimates = [ResampleRowsWeighted(live).totalwgt_lb.mean()
-                 for _ in range(iters)]
+    bootstrap = thinkstats2.Bootstrap(live, iters, weights='finalwgt',
+                                      method=method)
+    estimates = bootstrap.Mean('totalwgt_lb')
     Summarize(estimates)
     
 
@@ -14,14 +14,21 @@ from collections import defaultdict
 
 def ReadFemResp(dct_file='2002FemResp.dct',
                 dat_file='2002FemResp.dat.gz',
-                nrows=None):
+                nrows=None, cache_dir=None):
     """Reads the NSFG respondent data.
 
     dct_file: string file name
     dat_file: string file name
+    cache_dir: string directory for a thinkstats2.FrameCache, or None
 
     returns: DataFrame
     """
+    if cache_dir is not None:
+        cache = thinkstats2.FrameCache(cache_dir)
+        return cache.Read(ReadFemResp, [dct_file, dat_file],
+                          args=(dct_file, dat_file, nrows),
+                          depends=[CleanFemResp])
+
     dct = thinkstats2.ReadStataDct(dct_file)
     df = dct.ReadFixedWidth(dat_file, compression='gzip', nrows=nrows)
     CleanFemResp(df)
@@ -37,14 +44,22 @@ def CleanFemResp(df):
 
 
 def ReadFemPreg(dct_file='2002FemPreg.dct',
-                dat_file='2002FemPreg.dat.gz'):
+                dat_file='2002FemPreg.dat.gz',
+                cache_dir=None):
     """Reads the NSFG pregnancy data.
 
     dct_file: string file name
     dat_file: string file name
+    cache_dir: string directory for a thinkstats2.FrameCache, or None
 
     returns: DataFrame
     """
+    if cache_dir is not None:
+        cache = thinkstats2.FrameCache(cache_dir)
+        return cache.Read(ReadFemPreg, [dct_file, dat_file],
+                          args=(dct_file, dat_file),
+                          depends=[CleanFemPreg])
+
     dct = thinkstats2.ReadStataDct(dct_file)
     df = dct.ReadFixedWidth(dat_file, compression='gzip')
     CleanFemPreg(df)
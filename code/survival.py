@@ -8,6 +8,8 @@ License: GNU GPLv3 http://www.gnu.org/licenses/gpl.html
 
 from __future__ import print_function, division
 
+import time
+
 import numpy as np
 import pandas as pd
 
@@ -17,6 +19,7 @@ import thinkstats2
 import thinkplot
 
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 
 FORMATS = ['pdf', 'eps', 'png']
 
@@ -274,6 +277,75 @@ def PlotHazard(complete, ongoing):
     thinkplot.Show(xlabel='t (weeks)')
 
 
+def _KaplanMeierTable(durations, ended=None, weights=None, entries=None):
+    """Computes the Kaplan-Meier table at each distinct duration.
+
+    durations: sequence of lifetimes, complete or ongoing
+    ended: sequence of boolean, whether each lifetime is complete;
+           default is all complete
+    weights: sequence of non-negative weights; default is all 1.
+             Rows with zero weight are left out.
+    entries: sequence of times when each subject came under observation,
+             for left-truncated data; a subject is at risk at times t
+             with entry < t <= duration.  Default is no truncation.
+
+    returns: tuple of arrays (ts, at_risk, ended, censored, lams)
+    """
+    durations = np.asarray(durations, dtype=float)
+    n = len(durations)
+    ended = (np.ones(n, dtype=bool) if ended is None
+             else np.asarray(ended, dtype=bool))
+    weights = (np.ones(n) if weights is None
+               else np.asarray(weights, dtype=float))
+
+    keep = weights > 0
+    values, inverse = np.unique(durations[keep], return_inverse=True)
+    weights = weights[keep]
+    m = len(values)
+
+    ended_w = np.bincount(inverse, weights * ended[keep], minlength=m)
+    total_w = np.bincount(inverse, weights, minlength=m)
+    at_risk = np.cumsum(total_w[::-1])[::-1]
+
+    if entries is not None:
+        # subtract the weight that has not entered yet at each time
+        entries = np.asarray(entries, dtype=float)[keep]
+        order = np.argsort(entries, kind='stable')
+        cum_w = np.concatenate([[0.0], np.cumsum(weights[order])])
+        entered = cum_w[np.searchsorted(entries[order], values, side='left')]
+        at_risk -= cum_w[-1] - entered
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        lams = np.where(at_risk > 0, ended_w / at_risk, 0.0)
+
+    return values, at_risk, ended_w, total_w - ended_w, lams
+
+
+def KaplanMeier(durations, ended=None, weights=None, entries=None,
+                label=''):
+    """Estimates hazard and survival functions by Kaplan-Meier.
+
+    http://en.wikipedia.org/wiki/Kaplan%E2%80%93Meier_estimator
+
+    Vectorized: counts the distinct durations with np.unique and gets
+    the number at risk from cumulative sums, so it takes O(n log n).
+
+    durations: sequence of lifetimes, complete or ongoing
+    ended: sequence of boolean, whether each lifetime is complete;
+           default is all complete
+    weights: sequence of non-negative weights; default is all 1
+    entries: sequence of entry times for left-truncated data, or None
+    label: string
+
+    returns: pair of HazardFunction, SurvivalFunction
+    """
+    ts, _, _, _, lams = _KaplanMeierTable(durations, ended, weights,
+                                          entries)
+    hf = HazardFunction(pd.Series(lams, index=ts), label=label)
+    sf = SurvivalFunction(ts, np.cumprod(1 - lams), label=label)
+    return hf, sf
+
+
 def EstimateHazardFunction(complete, ongoing, label='', verbose=False):
     """Estimates the hazard function by Kaplan-Meier.
 
@@ -284,31 +356,23 @@ def EstimateHazardFunction(complete, ongoing, label='', verbose=False):
     label: string
     verbose: whether to display intermediate results
     """
+    complete = np.asarray(complete, dtype=float)
+    ongoing = np.asarray(ongoing, dtype=float)
     if np.sum(np.isnan(complete)):
         raise ValueError("complete contains NaNs")
     if np.sum(np.isnan(ongoing)):
         raise ValueError("ongoing contains NaNs")
 
-    hist_complete = Counter(complete)
-    hist_ongoing = Counter(ongoing)
-
-    ts = list(hist_complete | hist_ongoing)
-    ts.sort()
-
-    at_risk = len(complete) + len(ongoing)
-
-    lams = pd.Series(index=ts)
-    for t in ts:
-        ended = hist_complete[t]
-        censored = hist_ongoing[t]
+    durations = np.concatenate([complete, ongoing])
+    ended = np.arange(len(durations)) < len(complete)
+    table = _KaplanMeierTable(durations, ended)
 
-        lams[t] = ended / at_risk
-        if verbose:
-            print('%0.3g\t%d\t%d\t%d\t%0.2g' % 
-                  (t, at_risk, ended, censored, lams[t]))
-        at_risk -= ended + censored
+    if verbose:
+        for row in zip(*table):
+            print('%0.3g\t%d\t%d\t%d\t%0.2g' % row)
 
-    return HazardFunction(lams, label=label)
+    ts, _, _, _, lams = table
+    return HazardFunction(pd.Series(lams, index=ts), label=label)
 
 
 def EstimateHazardNumpy(complete, ongoing, label=''):
@@ -324,10 +388,10 @@ def EstimateHazardNumpy(complete, ongoing, label=''):
     hist_complete = Counter(complete)
     hist_ongoing = Counter(ongoing)
 
-    ts = set(hist_complete) | set(hist_ongoing)
+    ts = sorted(set(hist_complete) | set(hist_ongoing))
     at_risk = len(complete) + len(ongoing)
 
-    ended = [hist_complete[t] for t in ts]
+    ended = np.array([hist_complete[t] for t in ts])
     ended_c = np.cumsum(ended)
     censored_c = np.cumsum([hist_ongoing[t] for t in ts])
 
@@ -342,6 +406,101 @@ def EstimateHazardNumpy(complete, ongoing, label=''):
     return HazardFunction(lams, label=label)
 
 
+def EstimateHazardWeighted(ts, ended, weights, label=''):
+    """Estimates the hazard function by Kaplan-Meier with weights.
+
+    Rows with zero weight are left out, so the weights can be bootstrap
+    replicate weights.
+
+    ts: sequence of lifetimes, complete or ongoing
+    ended: sequence of boolean, whether each lifetime is complete
+    weights: sequence of non-negative weights
+    label: string
+
+    returns: HazardFunction
+    """
+    hf, _ = KaplanMeier(ts, ended, weights, label=label)
+    return hf
+
+
+def _InterpRows(ts, xs, ys):
+    """Interpolates each row of ys, like SurvivalFunction.Probs.
+
+    ts: sequence of times to evaluate
+    xs: sorted array of times
+    ys: array with one row per curve and one column per time in xs
+
+    returns: array with one row per curve and one column per time in ts
+    """
+    ts = np.asarray(ts, dtype=float)
+    if len(xs) == 1:
+        res = np.repeat(ys[:, :1], len(ts), axis=1)
+    else:
+        j = np.clip(np.searchsorted(xs, ts, side='right'), 1, len(xs) - 1)
+        frac = np.clip((ts - xs[j-1]) / (xs[j] - xs[j-1]), 0, 1)
+        res = ys[:, j-1] * (1 - frac) + ys[:, j] * frac
+    res[:, ts < xs[0]] = 1.0
+    return res
+
+
+def EstimateSurvivalMatrix(durations, ended, ws, ts):
+    """Estimates Kaplan-Meier survival curves for many sets of weights.
+
+    Sorts the durations once, sums the weights at each distinct
+    duration with np.add.reduceat, and gets the weight at risk from
+    reversed cumulative sums, all with one row per set of weights.
+
+    durations: sequence of lifetimes, complete or ongoing
+    ended: sequence of boolean, whether each lifetime is complete
+    ws: array of weights, one row per replicate and one column per
+        lifetime, like the blocks from thinkstats2.Bootstrap.Weights
+    ts: sequence of times where the survival curves are evaluated
+
+    returns: array with one row per replicate and one column per time
+    """
+    durations = np.asarray(durations, dtype=float)
+    order = np.argsort(durations, kind='stable')
+    values, starts = np.unique(durations[order], return_index=True)
+    ws = np.atleast_2d(ws)[:, order]
+    ended = np.asarray(ended, dtype=bool)[order]
+
+    total_w = np.add.reduceat(ws, starts, axis=1)
+    ended_w = np.add.reduceat(ws * ended, starts, axis=1)
+    at_risk = np.cumsum(total_w[:, ::-1], axis=1)[:, ::-1]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        lams = np.where(at_risk > 0, ended_w / at_risk, 0.0)
+
+    ss = np.cumprod(1 - lams, axis=1)
+    return _InterpRows(ts, values, ss)
+
+
+def SurvivalBands(durations, ended, weights, ts, iters=101,
+                  percents=(5, 95), method='resample', seed=None):
+    """Computes bootstrap percentile bands for a survival curve.
+
+    durations: sequence of lifetimes, complete or ongoing
+    ended: sequence of boolean, whether each lifetime is complete
+    weights: sequence of survey weights, or None
+    ts: sequence of times where the bands are evaluated
+    iters: number of replicates
+    percents: sequence of percentiles (0-100)
+    method: 'resample', 'poisson' or 'bayes' (see thinkstats2.Bootstrap)
+    seed: seed for thinkstats2.Bootstrap
+
+    returns: list of arrays, one for each percentile
+    """
+    if weights is None:
+        frame, column = pd.DataFrame(index=range(len(durations))), None
+    else:
+        frame, column = pd.DataFrame(dict(weight=weights)), 'weight'
+    bootstrap = thinkstats2.Bootstrap(frame, iters, weights=column,
+                                      seed=seed, method=method)
+
+    ss = [EstimateSurvivalMatrix(durations, ended, ws, ts)
+          for ws in bootstrap.Weights()]
+    return thinkstats2.PercentileRows(np.concatenate(ss), percents)
+
+
 def AddLabelsByDecade(groups, **options):
     """Draws fake points in order to add labels to the legend.
 
@@ -382,11 +541,13 @@ def PlotPredictionsByDecade(groups, **options):
         thinkplot.Plot(sf, **options)
 
 
-def ResampleSurvival(resp, iters=101):
+def ResampleSurvival(resp, iters=101, method='resample'):
     """Resamples respondents and estimates the survival function.
 
     resp: DataFrame of respondents
     iters: number of resamples
+    method: 'resample', or 'poisson' or 'bayes' to reweight the
+            respondents instead (see thinkstats2.Bootstrap)
     """ 
     _, sf = EstimateMarriageSurvival(resp)
     thinkplot.Plot(sf)
@@ -394,13 +555,10 @@ def ResampleSurvival(resp, iters=101):
     low, high = resp.agemarry.min(), resp.agemarry.max()
     ts = np.arange(low, high, 1/12.0)
 
-    ss_seq = []
-    for _ in range(iters):
-        sample = thinkstats2.ResampleRowsWeighted(resp)
-        _, sf = EstimateMarriageSurvival(sample)
-        ss_seq.append(sf.Probs(ts))
-
-    low, high = thinkstats2.PercentileRows(ss_seq, [5, 95])
+    durations, ended, keep = MarriageData(resp)
+    weights = resp.finalwgt.values[keep]
+    low, high = SurvivalBands(durations, ended, weights, ts, iters,
+                              method=method)
     thinkplot.FillBetween(ts, low, high, color='gray', label='90% CI')
     thinkplot.Save(root='survival3',
                    xlabel='age (years)',
@@ -410,6 +568,24 @@ def ResampleSurvival(resp, iters=101):
                    formats=FORMATS)
 
 
+def MarriageData(resp):
+    """Gets durations and event flags for the marriage survival curve.
+
+    Uses the same respondents as EstimateMarriageSurvival: agemarry for
+    those who married, age for those who have not.
+
+    resp: DataFrame of respondents
+
+    returns: tuple of (durations, ended, keep), where keep is a boolean
+             array that selects the rows of resp that were used
+    """
+    married = (resp.evrmarry == 1).values & resp.agemarry.notna().values
+    unmarried = (resp.evrmarry == 0).values
+    keep = married | unmarried
+    durations = np.where(married, resp.agemarry.values, resp.age.values)
+    return durations[keep], married[keep], keep
+
+
 def EstimateMarriageSurvival(resp):
     """Estimates the survival curve.
 
@@ -516,9 +692,9 @@ def PlotResampledByDecade(resps, iters=11, predict_flag=False, omit=None):
     iters: number of resamples to plot
     predict_flag: whether to also plot predictions
     """
+    resamplers = [thinkstats2.WeightedResampler(resp) for resp in resps]
     for i in range(iters):
-        samples = [thinkstats2.ResampleRowsWeighted(resp) 
-                   for resp in resps]
+        samples = [resampler.Resample() for resampler in resamplers]
         sample = pd.concat(samples, ignore_index=True)
         groups = sample.groupby('decade')
 
@@ -538,15 +714,96 @@ def PlotResampledByDecade(resps, iters=11, predict_flag=False, omit=None):
             EstimateMarriageSurvivalByDecade(groups, alpha=0.2)
 
 
+def SurvivalBandsByGroup(resp, column='decade', ts=None, iters=101,
+                         percents=(5, 95), method='resample',
+                         processes=None, seed=None):
+    """Computes bootstrap bands for marriage survival curves by group.
+
+    Each group is resampled separately, with weights finalwgt, and the
+    groups are spread across worker processes.
+
+    resp: DataFrame of respondents
+    column: string column name to group by
+    ts: sequence of times where the bands are evaluated; default is
+        monthly over the range of agemarry
+    iters: number of replicates for each group
+    percents: sequence of percentiles (0-100)
+    method: 'resample', 'poisson' or 'bayes' (see thinkstats2.Bootstrap)
+    processes: number of worker processes; default is one per group;
+               1 computes the bands in this process
+    seed: int seed, or None to draw one from np.random
+
+    returns: tuple of (ts, bands), where bands maps from each group
+             to a list of arrays, one for each percentile
+    """
+    if ts is None:
+        ts = np.arange(resp.agemarry.min(), resp.agemarry.max(), 1/12.0)
+
+    names, durations, ended, weights = [], [], [], []
+    for name, group in resp.groupby(column):
+        group_durations, group_ended, keep = MarriageData(group)
+        names.append(name)
+        durations.append(group_durations)
+        ended.append(group_ended)
+        weights.append(group.finalwgt.values[keep])
+
+    n = len(names)
+    if seed is None:
+        seed = np.random.randint(2**63, dtype=np.int64)
+    seeds = np.random.SeedSequence(seed).spawn(n)
+    args = [durations, ended, weights, [ts] * n, [iters] * n,
+            [percents] * n, [method] * n, seeds]
+
+    if processes is None:
+        processes = n
+    if processes <= 1:
+        results = list(map(SurvivalBands, *args))
+    else:
+        with ProcessPoolExecutor(processes) as executor:
+            results = list(executor.map(SurvivalBands, *args))
+
+    return ts, dict(zip(names, results))
+
+
+def PlotSurvivalBandsByDecade(resps, iters=101, omit=None, processes=None,
+                              **options):
+    """Plots 90% bootstrap bands for survival curves by decade of birth.
+
+    resps: list of DataFrames
+    iters: number of replicates for each decade
+    omit: list of decades to leave out
+    processes: number of worker processes, see SurvivalBandsByGroup
+    """
+    resp = pd.concat(resps, ignore_index=True)
+    if omit:
+        resp = resp[~resp.decade.isin(omit)]
+
+    ts, bands = SurvivalBandsByGroup(resp, iters=iters, processes=processes)
+
+    thinkplot.PrePlot(len(bands))
+    for name, (low, high) in sorted(bands.items()):
+        label = '%d0s' % name
+        thinkplot.FillBetween(ts, low, high, label=label, **options)
+
 
 # NOTE: The functions below are copied from marriage.py in
 # the MarriageNSFG repo.
 
-def ReadFemResp1995():
+def ReadFemResp1995(cache_dir=None, fast=False):
     """Reads respondent data from NSFG Cycle 5.
 
+    cache_dir: string directory for a thinkstats2.FrameCache, or None
+    fast: boolean, whether to use FixedWidthVariables.ReadFixedWidthFast
+
     returns: DataFrame
     """
+    if cache_dir is not None:
+        cache = thinkstats2.FrameCache(cache_dir)
+        return cache.Read(ReadFemResp1995,
+                          ['1995FemRespData.dat.gz'],
+                          depends=[CleanFemResp],
+                          kwargs=dict(fast=fast))
+
     dat_file = '1995FemRespData.dat.gz'
     names = ['cmintvw', 'timesmar', 'cmmarrhx', 'cmbirth', 'finalwgt']
     colspecs = [(12360-1, 12363),
@@ -554,57 +811,96 @@ def ReadFemResp1995():
                 (11759-1, 11762),
                 (14-1, 16),
                 (12350-1, 12359)]
-    df = pd.read_fwf(dat_file, 
-                         compression='gzip', 
-                         colspecs=colspecs, 
+    if fast:
+        starts, ends = zip(*colspecs)
+        variables = pd.DataFrame(dict(name=names, start=starts, end=ends,
+                                      type=int))
+        dct = thinkstats2.FixedWidthVariables(variables)
+        df = dct.ReadFixedWidthFast(dat_file, compression='gzip')
+    else:
+        df = pd.read_fwf(dat_file,
+                         compression='gzip',
+                         colspecs=colspecs,
                          names=names)
 
-    df.timesmar.replace([98, 99], np.nan, inplace=True)
+    df['timesmar'] = df.timesmar.replace([98, 99], np.nan)
     df['evrmarry'] = (df.timesmar > 0)
 
     CleanFemResp(df)
     return df
 
 
-def ReadFemResp2002():
+def ReadFemResp2002(cache_dir=None, fast=False):
     """Reads respondent data from NSFG Cycle 6.
 
+    cache_dir: string directory for a thinkstats2.FrameCache, or None
+    fast: boolean, whether to use FixedWidthVariables.ReadFixedWidthFast
+
     returns: DataFrame
     """
+    if cache_dir is not None:
+        cache = thinkstats2.FrameCache(cache_dir)
+        return cache.Read(ReadFemResp2002,
+                          ['2002FemResp.dct', '2002FemResp.dat.gz'],
+                          depends=[ReadFemResp, CleanFemResp],
+                          kwargs=dict(fast=fast))
+
     usecols = ['caseid', 'cmmarrhx', 'cmdivorcx', 'cmbirth', 'cmintvw', 
                'evrmarry', 'parity', 'finalwgt']
-    df = ReadFemResp(usecols=usecols)
+    df = ReadFemResp(usecols=usecols, fast=fast)
     df['evrmarry'] = (df.evrmarry == 1)
     CleanFemResp(df)
     return df
 
 
-def ReadFemResp2010():
+def ReadFemResp2010(cache_dir=None, fast=False):
     """Reads respondent data from NSFG Cycle 7.
 
+    cache_dir: string directory for a thinkstats2.FrameCache, or None
+    fast: boolean, whether to use FixedWidthVariables.ReadFixedWidthFast
+
     returns: DataFrame
     """
+    if cache_dir is not None:
+        cache = thinkstats2.FrameCache(cache_dir)
+        return cache.Read(ReadFemResp2010,
+                          ['2006_2010_FemRespSetup.dct',
+                           '2006_2010_FemResp.dat.gz'],
+                          depends=[ReadFemResp, CleanFemResp],
+                          kwargs=dict(fast=fast))
+
     usecols = ['caseid', 'cmmarrhx', 'cmdivorcx', 'cmbirth', 'cmintvw',
                'evrmarry', 'parity', 'wgtq1q16']
     df = ReadFemResp('2006_2010_FemRespSetup.dct',
-                       '2006_2010_FemResp.dat.gz',
-                        usecols=usecols)
+                     '2006_2010_FemResp.dat.gz',
+                     usecols=usecols, fast=fast)
     df['evrmarry'] = (df.evrmarry == 1)
     df['finalwgt'] = df.wgtq1q16
     CleanFemResp(df)
     return df
 
 
-def ReadFemResp2013():
+def ReadFemResp2013(cache_dir=None, fast=False):
     """Reads respondent data from NSFG Cycle 8.
 
+    cache_dir: string directory for a thinkstats2.FrameCache, or None
+    fast: boolean, whether to use FixedWidthVariables.ReadFixedWidthFast
+
     returns: DataFrame
     """
+    if cache_dir is not None:
+        cache = thinkstats2.FrameCache(cache_dir)
+        return cache.Read(ReadFemResp2013,
+                          ['2011_2013_FemRespSetup.dct',
+                           '2011_2013_FemRespData.dat.gz'],
+                          depends=[ReadFemResp, CleanFemResp],
+                          kwargs=dict(fast=fast))
+
     usecols = ['caseid', 'cmmarrhx', 'cmdivorcx', 'cmbirth', 'cmintvw',
                'evrmarry', 'parity', 'wgt2011_2013']
     df = ReadFemResp('2011_2013_FemRespSetup.dct',
                         '2011_2013_FemRespData.dat.gz',
-                        usecols=usecols)
+                        usecols=usecols, fast=fast)
     df['evrmarry'] = (df.evrmarry == 1)
     df['finalwgt'] = df.wgt2011_2013
     CleanFemResp(df)
@@ -613,15 +909,25 @@ def ReadFemResp2013():
 
 def ReadFemResp(dct_file='2002FemResp.dct',
                 dat_file='2002FemResp.dat.gz',
+                fast=False,
                 **options):
     """Reads the NSFG respondent data.
 
     dct_file: string file name
     dat_file: string file name
+    fast: boolean, whether to use FixedWidthVariables.ReadFixedWidthFast;
+          small integer columns with blanks come back as float32, so
+          they are converted to float64 to match read_fwf
 
     returns: DataFrame
     """
     dct = thinkstats2.ReadStataDct(dct_file, encoding='iso-8859-1')
+    if fast:
+        df = dct.ReadFixedWidthFast(dat_file, compression='gzip', **options)
+        for name in df.columns[df.dtypes == np.float32]:
+            df[name] = df[name].astype(np.float64)
+        return df
+
     df = dct.ReadFixedWidth(dat_file, compression='gzip', **options)
     return df
 
@@ -633,7 +939,7 @@ def CleanFemResp(resp):
 
     Adds columns: agemarry, age, decade, fives
     """
-    resp.cmmarrhx.replace([9997, 9998, 9999], np.nan, inplace=True)
+    resp['cmmarrhx'] = resp.cmmarrhx.replace([9997, 9998, 9999], np.nan)
 
     resp['agemarry'] = (resp.cmmarrhx - resp.cmbirth) / 12.0
     resp['age'] = (resp.cmintvw - resp.cmbirth) / 12.0
@@ -646,6 +952,106 @@ def CleanFemResp(resp):
     resp['fives'] = resp.year // 5
 
 
+# functions that read each NSFG cycle
+CYCLE_READERS = {
+    5: ReadFemResp1995,
+    6: ReadFemResp2002,
+    7: ReadFemResp2010,
+    8: ReadFemResp2013,
+}
+
+# columns of the combined respondent frame, and their types
+CYCLE_COLUMNS = [
+    ('caseid', np.float64),
+    ('cmintvw', np.float64),
+    ('cmbirth', np.float64),
+    ('cmmarrhx', np.float64),
+    ('cmdivorcx', np.float64),
+    ('evrmarry', bool),
+    ('parity', np.float64),
+    ('finalwgt', np.float64),
+    ('agemarry', np.float64),
+    ('age', np.float64),
+    ('year', np.int64),
+    ('decade', np.int64),
+    ('fives', np.int64),
+]
+
+
+def _ReadCycle(cycle, cache_dir=None):
+    """Reads one NSFG cycle and times it; runs in a worker process.
+
+    cycle: int cycle number, a key in CYCLE_READERS
+    cache_dir: string directory for a thinkstats2.FrameCache, or None
+
+    returns: tuple of cycle, DataFrame, elapsed seconds
+    """
+    start = time.time()
+    df = CYCLE_READERS[cycle](cache_dir=cache_dir, fast=True)
+    return cycle, df, time.time() - start
+
+
+def HarmonizeCycle(df, cycle):
+    """Selects and converts the columns that all cycles share.
+
+    Columns a cycle doesn't have (like caseid in Cycle 5) are filled
+    with NaN.
+
+    df: DataFrame of respondents from one cycle
+    cycle: int cycle number
+
+    returns: new DataFrame with CYCLE_COLUMNS and a cycle column
+    """
+    columns = {}
+    for name, dtype in CYCLE_COLUMNS:
+        if name in df:
+            columns[name] = df[name].astype(dtype)
+        else:
+            columns[name] = np.full(len(df), np.nan)
+    columns['cycle'] = np.full(len(df), cycle, dtype=np.int8)
+    return pd.DataFrame(columns, index=df.index)
+
+
+def ReadFemRespCycles(cycles=(5, 6, 7, 8), processes=None, cache_dir=None,
+                      verbose=False):
+    """Reads several NSFG cycles in parallel and combines them.
+
+    Each cycle is read in its own worker process.  The results have the
+    columns in CYCLE_COLUMNS, plus a cycle column.  The time it took to
+    read each cycle is in df.attrs['timings'], a map from cycle to
+    seconds.
+
+    cycles: sequence of cycle numbers, keys in CYCLE_READERS
+    processes: number of worker processes; default is one per cycle;
+               1 reads the cycles in this process
+    cache_dir: string directory for a thinkstats2.FrameCache, or None
+    verbose: boolean, whether to print the timings
+
+    returns: DataFrame
+    """
+    if processes is None:
+        processes = len(cycles)
+
+    n = len(cycles)
+    if processes <= 1:
+        results = [_ReadCycle(cycle, cache_dir) for cycle in cycles]
+    else:
+        with ProcessPoolExecutor(processes) as executor:
+            results = list(executor.map(_ReadCycle, cycles,
+                                        [cache_dir] * n))
+
+    frames = [HarmonizeCycle(df, cycle) for cycle, df, _ in results]
+    df = pd.concat(frames, ignore_index=True)
+
+    timings = {cycle: elapsed for cycle, _, elapsed in results}
+    df.attrs['timings'] = timings
+    if verbose:
+        for cycle, elapsed in timings.items():
+            print('cycle %d: %.2f s' % (cycle, elapsed))
+
+    return df
+
+
 def main():
     thinkstats2.RandomSeed(17)
     
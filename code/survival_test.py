@@ -8,6 +8,8 @@ License: GNU GPLv3 http://www.gnu.org/licenses/gpl.html
 from __future__ import print_function, division
 
 import unittest
+import numpy as np
+import pandas as pd
 import survival
 
 import thinkstats2
@@ -26,6 +28,74 @@ class Test(unittest.TestCase):
         self.assertAlmostEqual(sf[3], 0.625)
         self.assertAlmostEqual(sf[5], 0.234375)
 
+    def testKaplanMeier(self):
+        complete = [1, 2, 3, 4, 5]
+        ongoing = [3, 4, 5]
+        hf = survival.EstimateHazardNumpy(complete, ongoing)
+        self.assertAlmostEqual(hf[3], 1/6.0)
+        self.assertAlmostEqual(hf[5], 0.5)
+
+        durations = complete + ongoing
+        ended = [True] * 5 + [False] * 3
+        hf, sf = survival.KaplanMeier(durations, ended)
+        self.assertAlmostEqual(hf[3], 1/6.0)
+        self.assertAlmostEqual(sf[5], 0.234375)
+
+        # the last subject is not at risk until after t=2.5
+        hf, sf = survival.KaplanMeier([1, 2, 3, 4, 5, 5],
+                                      entries=[0, 0, 0, 0, 0, 2.5])
+        self.assertAlmostEqual(hf[2], 1/4.0)
+        self.assertAlmostEqual(hf[3], 1/4.0)
+        self.assertAlmostEqual(sf[3], 0.45)
+
+    def testEstimateHazardWeighted(self):
+        ts = [1, 2, 3, 4, 5, 3, 4, 5, 9]
+        ended = [1, 1, 1, 1, 1, 0, 0, 0, 1]
+        weights = [1, 1, 1, 1, 1, 1, 1, 1, 0]
+        hf = survival.EstimateHazardWeighted(ts, ended, weights)
+        self.assertEqual(len(hf), 5)
+        self.assertAlmostEqual(hf[3], 1/6.0)
+        self.assertAlmostEqual(hf[5], 0.5)
+
+        # doubling every weight does not change the estimate
+        hf2 = survival.EstimateHazardWeighted(ts, ended, [2] * 8 + [0])
+        self.assertAlmostEqual(hf2[5], 0.5)
+
+    def testSurvivalBands(self):
+        complete = [1, 2, 3, 4, 5]
+        ongoing = [3, 4, 5]
+        sf = survival.EstimateHazardFunction(complete, ongoing).MakeSurvival()
+
+        durations = complete + ongoing
+        ended = [True] * 5 + [False] * 3
+        ts = [0, 3, 3.5, 5, 6]
+        ss = survival.EstimateSurvivalMatrix(durations, ended,
+                                             np.ones((2, 8)), ts)
+        self.assertTrue(np.allclose(ss[1], sf.Probs(ts)))
+
+        agemarry = (complete + [np.nan] * 3) * 2
+        resp = pd.DataFrame(dict(evrmarry=[1, 1, 1, 1, 1, 0, 0, 0] * 2,
+                                 agemarry=agemarry,
+                                 age=[30] * 5 + ongoing + [30] * 5 + ongoing,
+                                 finalwgt=[1.0] * 16,
+                                 decade=[5] * 8 + [6] * 8))
+        ts, bands = survival.SurvivalBandsByGroup(resp, iters=11,
+                                                  processes=1, seed=17)
+        self.assertEqual(sorted(bands), [5, 6])
+        low, high = bands[5]
+        self.assertEqual(len(low), len(ts))
+        self.assertTrue(np.all(low <= high))
+
+    def testReadFemRespCycles(self):
+        df = survival.ReadFemRespCycles([6], processes=1)
+        self.assertEqual(len(df), 7643)
+        self.assertEqual(list(df.columns[-1:]), ['cycle'])
+        self.assertTrue((df.cycle == 6).all())
+        self.assertIn(6, df.attrs['timings'])
+
+        resp = survival.ReadFemResp2002()
+        self.assertAlmostEqual(df.agemarry.mean(), resp.agemarry.mean())
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -513,19 +513,26 @@ def Diff(t):
     return diffs
 
 
-def Cdf(cdf, complement=False, transform=None, **options):
+def Cdf(cdf, complement=False, transform=None, max_points=None, **options):
     """Plots a CDF as a line.
 
     Args:
       cdf: Cdf object
       complement: boolean, whether to plot the complementary CDF
       transform: string, one of 'exponential', 'pareto', 'weibull', 'gumbel'
+      max_points: if the Cdf has more points than this and provides
+                  Compress, plot a compressed copy; default is to plot
+                  every point
       options: keyword args passed to plt.plot
 
     Returns:
       dictionary with the scale options that should be passed to
       Config, Show or Save.
     """
+    compress = max_points is not None and hasattr(cdf, "Compress")
+    if compress and len(cdf) > max_points:
+        cdf = cdf.Compress(max_points=max_points)
+
     xs, ps = cdf.Render()
     xs = np.asarray(xs)
     ps = np.asarray(ps)
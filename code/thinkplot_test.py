@@ -25,6 +25,26 @@ class Test(unittest.TestCase):
         thinkplot.Hist(hist, width=1)
         thinkplot.Show()
 
+    def testCdfRenderOnly(self):
+        class Renderable(object):
+            label = 'renderable'
+
+            def Render(self):
+                return [1, 2, 3], [0.2, 0.5, 1.0]
+
+        thinkplot.Cdf(Renderable())
+        thinkplot.Clf()
+
+    def testCdfMaxPoints(self):
+        cdf = thinkstats2.Cdf(np.random.normal(size=1000))
+        thinkplot.Clf()
+        thinkplot.Cdf(cdf)
+        thinkplot.Cdf(cdf, max_points=100)
+        lines = thinkplot.plt.gca().get_lines()
+        self.assertEqual(len(lines[0].get_xdata()), len(cdf.Render()[0]))
+        self.assertLess(len(lines[1].get_xdata()), len(lines[0].get_xdata()))
+        thinkplot.Clf()
+
 
 if __name__ == "__main__":
     unittest.main()
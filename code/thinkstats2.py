@@ -21,13 +21,22 @@ Pdf: represents a continuous probability density function
 
 import bisect
 import copy
+import hashlib
+import inspect
+import itertools
+import json
 import logging
 import math
+import os
 import random
 import re
+import shutil
+import tempfile
 
 from collections import Counter
-from operator import itemgetter
+from collections.abc import MutableMapping
+from concurrent.futures import ProcessPoolExecutor
+from operator import itemgetter, lt, gt, eq
 
 import thinkplot
 
@@ -38,6 +47,7 @@ import scipy
 from scipy import stats
 from scipy import special
 from scipy import ndimage
+from scipy import signal
 
 from scipy.special import gamma
 
@@ -132,21 +142,237 @@ class Interpolator(object):
 DEFAULT_LABEL = "_nolegend_"
 
 
+class _ArrayDict(MutableMapping):
+    """A dict-like map from values to freqs/probs, stored in NumPy arrays.
+
+    The values are kept in sorted order, so lookups are binary searches
+    and bulk operations (totals, moments, tail sums) can be vectorized.
+    Inserting a new value is O(n), so this representation is best for
+    distributions that are built in bulk and then mostly read.
+
+    Attributes:
+        xs: sorted NumPy array of values
+        ps: NumPy array of the corresponding freqs/probs
+    """
+
+    def __init__(self, xs=(), ps=()):
+        """Initializes.
+
+        If xs contains duplicates, the corresponding ps are added up.
+        ps is copied, since __setitem__ modifies it in place.
+
+        xs: sequence of values (must be sortable)
+        ps: sequence of freqs/probs
+        """
+        xs = np.asarray(xs)
+        ps = np.array(ps)
+        if xs.shape != ps.shape:
+            raise ValueError("_ArrayDict: xs and ps must have the same length")
+
+        if len(xs) > 1 and not np.all(xs[1:] > xs[:-1]):
+            xs, inverse = np.unique(xs, return_inverse=True)
+            totals = np.bincount(inverse.ravel(), weights=ps)
+            if ps.dtype.kind in "iub":
+                totals = totals.astype(ps.dtype)
+            ps = totals
+
+        self.xs = xs
+        self.ps = ps
+
+    def _Find(self, x):
+        """Finds the index of x in xs.
+
+        x: value
+
+        returns: pair of (index, boolean whether x is present)
+        """
+        try:
+            i = int(np.searchsorted(self.xs, x))
+            found = i < len(self.xs) and bool(self.xs[i] == x)
+        except (TypeError, ValueError):
+            # x can't be compared with the values in xs
+            return 0, False
+        return i, found
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+    def __len__(self):
+        return len(self.xs)
+
+    def __iter__(self):
+        return iter(self.xs.tolist())
+
+    def __contains__(self, x):
+        return self._Find(x)[1]
+
+    def __getitem__(self, x):
+        i, found = self._Find(x)
+        if not found:
+            raise KeyError(x)
+        return self.ps[i].item()
+
+    def __setitem__(self, x, p):
+        i, found = self._Find(x)
+        self.ps = _PromoteArray(self.ps, p)
+        if found:
+            self.ps[i] = p
+            return
+
+        self.xs = _PromoteArray(self.xs, x)
+        self.xs = np.insert(self.xs, i, x)
+        self.ps = np.insert(self.ps, i, p)
+
+    def __delitem__(self, x):
+        i, found = self._Find(x)
+        if not found:
+            raise KeyError(x)
+        self.xs = np.delete(self.xs, i)
+        self.ps = np.delete(self.ps, i)
+
+    def __copy__(self):
+        return _ArrayDict(self.xs.copy(), self.ps.copy())
+
+    copy = __copy__
+
+    def get(self, x, default=None):
+        i, found = self._Find(x)
+        return self.ps[i].item() if found else default
+
+    def keys(self):
+        return self.xs.tolist()
+
+    def values(self):
+        return self.ps.tolist()
+
+    def items(self):
+        return list(zip(self.xs.tolist(), self.ps.tolist()))
+
+    def clear(self):
+        self.xs = self.xs[:0]
+        self.ps = self.ps[:0]
+
+    def update(self, other=()):
+        """Adds the items from other, replacing existing values.
+
+        other: mapping or sequence of (value, freq/prob) pairs
+        """
+        if isinstance(other, _ArrayDict):
+            xs, ps = other.xs, other.ps
+        else:
+            items = list(other.items() if hasattr(other, "items") else other)
+            if len(items) == 0:
+                return
+            xs, ps = zip(*items)
+            xs, ps = np.asarray(xs), np.asarray(ps)
+
+        if len(self.xs):
+            xs = np.concatenate((self.xs, xs))
+            ps = np.concatenate((self.ps, ps))
+
+        # stable sort puts the new value of a duplicate after the old one;
+        # keep the last entry for each value
+        order = np.argsort(xs, kind="stable")
+        xs, ps = xs[order], ps[order]
+        keep = np.append(xs[1:] != xs[:-1], True)
+        self.xs = xs[keep]
+        self.ps = ps[keep]
+
+
+def _PromoteArray(a, value):
+    """Converts an array to a dtype that can also hold the given value.
+
+    a: NumPy array
+    value: scalar
+
+    returns: NumPy array (a itself if no conversion is needed)
+    """
+    if len(a) == 0:
+        return np.asarray([value])[:0]
+    try:
+        dtype = np.result_type(a, value)
+    except TypeError:
+        dtype = object
+    return a if dtype == a.dtype else a.astype(dtype)
+
+
+def _CountValues(obj):
+    """Counts the distinct values in a chunk of data.
+
+    Numeric data is counted with np.unique; anything else goes through
+    Counter (or value_counts for a Series), like the Hist constructor.
+    NaNs in a pandas Series are dropped, like Series.value_counts.
+
+    obj: Hist, Pmf, dict, pandas Series, NumPy array, or any iterable
+
+    returns: pair of sequences, distinct values and their counts
+    """
+    if isinstance(obj, _DictWrapper):
+        obj = obj.d
+    if isinstance(obj, _ArrayDict):
+        return obj.xs, obj.ps
+    if isinstance(obj, dict):
+        return list(obj.keys()), list(obj.values())
+    if isinstance(obj, pandas.DataFrame):
+        raise ValueError(
+            "Can't count the values in a DataFrame; select a column first"
+        )
+
+    if isinstance(obj, pandas.Series):
+        if obj.dtype.kind not in "biuf":
+            counts = obj.value_counts()
+            return counts.index.tolist(), counts.values.tolist()
+        obj = obj.dropna().values
+    elif not isinstance(obj, np.ndarray):
+        obj = list(obj)
+
+    array = np.asarray(obj)
+    if array.dtype.kind not in "biuf":
+        counter = Counter(obj)
+        return list(counter.keys()), list(counter.values())
+    return np.unique(array, return_counts=True)
+
+
+def _ValuesArray(values):
+    """Makes a 1-D array of values, using dtype object if necessary.
+
+    np.asarray would turn a list of tuples into a 2-D array and a mix of
+    numbers and strings into strings.
+
+    values: list
+    """
+    array = np.asarray(values)
+    if array.ndim == 1:
+        if array.dtype.kind in "biuf":
+            return array
+        if array.dtype.kind == "U" and all(isinstance(x, str) for x in values):
+            return array
+
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+
 class _DictWrapper(object):
     """An object that contains a dictionary."""
 
-    def __init__(self, obj=None, label=None):
+    def __init__(self, obj=None, label=None, array=False):
         """Initializes the distribution.
 
         obj: Hist, Pmf, Cdf, Pdf, dict, pandas Series, list of pairs
         label: string label
+        array: boolean, whether to store the distribution in sorted
+               NumPy arrays instead of a dict; the values must be sortable
         """
         self.label = label if label is not None else DEFAULT_LABEL
-        self.d = {}
+        self.d = _ArrayDict() if array else {}
 
         # flag whether the distribution is under a log transform
         self.log = False
 
+        # structures derived from d, built on demand
+        self._Invalidate()
+
         if obj is None:
             return
 
@@ -157,6 +383,8 @@ class _DictWrapper(object):
             self.d.update(obj.items())
         elif isinstance(obj, (_DictWrapper, Cdf, Pdf)):
             self.d.update(obj.Items())
+        elif array:
+            self.d = _ArrayDict(*_CountValues(obj))
         elif isinstance(obj, pandas.Series):
             self.d.update(obj.value_counts().items())
         else:
@@ -199,6 +427,30 @@ class _DictWrapper(object):
         """Returns an iterator over keys."""
         return iter(self.d)
 
+    def IsArray(self):
+        """Checks whether this distribution is stored in sorted arrays."""
+        return isinstance(self.d, _ArrayDict)
+
+    def ToArrays(self):
+        """Returns the values and freqs/probs as NumPy arrays.
+
+        The result is compact to pickle or save with np.savez, and
+        MakeHistFromArrays or MakePmfFromArrays restores it.
+
+        returns: dict with keys xs, ps and label
+        """
+        if self.IsArray():
+            xs, ps = self.d.xs.copy(), self.d.ps.copy()
+        else:
+            items = list(self.Items())
+            try:
+                items.sort()
+            except TypeError:
+                pass
+            xs = _ValuesArray([x for x, _ in items])
+            ps = np.asarray([p for _, p in items])
+        return dict(xs=xs, ps=ps, label=self.label)
+
     def __contains__(self, value):
         return value in self.d
 
@@ -207,9 +459,20 @@ class _DictWrapper(object):
 
     def __setitem__(self, value, prob):
         self.d[value] = prob
+        self._Invalidate()
 
     def __delitem__(self, value):
         del self.d[value]
+        self._Invalidate()
+
+    def _Invalidate(self):
+        """Discards cached structures that depend on the contents of d.
+
+        Methods that modify the distribution call this; if you modify d
+        directly, call it yourself.
+        """
+        self._sampler = None
+        self._cum_index = None
 
     def Copy(self, label=None):
         """Returns a copy.
@@ -234,6 +497,11 @@ class _DictWrapper(object):
         Returns: new object
         """
         new = self.Copy()
+        new._Invalidate()
+        if self.IsArray():
+            new.d = _ArrayDict(_Widen(self.d.xs) * factor, self.d.ps.copy())
+            return new
+
         new.d.clear()
 
         for val, prob in self.Items():
@@ -250,10 +518,17 @@ class _DictWrapper(object):
         if self.log:
             raise ValueError("Pmf/Hist already under a log transform")
         self.log = True
+        self._Invalidate()
 
         if m is None:
             m = self.MaxLike()
 
+        if self.IsArray():
+            nonzero = self.d.ps != 0
+            xs, ps = self.d.xs[nonzero], self.d.ps[nonzero]
+            self.d = _ArrayDict(xs, np.log(ps / m))
+            return
+
         for x, p in self.d.items():
             if p:
                 self.Set(x, math.log(p / m))
@@ -270,10 +545,15 @@ class _DictWrapper(object):
         if not self.log:
             raise ValueError("Pmf/Hist not under a log transform")
         self.log = False
+        self._Invalidate()
 
         if m is None:
             m = self.MaxLike()
 
+        if self.IsArray():
+            self.d.ps = np.exp(self.d.ps - m)
+            return
+
         for x, p in self.d.items():
             self.Set(x, math.exp(p - m))
 
@@ -284,6 +564,7 @@ class _DictWrapper(object):
     def SetDict(self, d):
         """Sets the dictionary."""
         self.d = d
+        self._Invalidate()
 
     def Values(self):
         """Gets an unsorted sequence of values.
@@ -347,6 +628,7 @@ class _DictWrapper(object):
             y: number freq or prob
         """
         self.d[x] = y
+        self._Invalidate()
 
     def Incr(self, x, term=1):
         """Increments the freq/prob associated with the value x.
@@ -356,6 +638,7 @@ class _DictWrapper(object):
             term: how much to increment by
         """
         self.d[x] = self.d.get(x, 0) + term
+        self._Invalidate()
 
     def Mult(self, x, factor):
         """Scales the freq/prob associated with the value x.
@@ -365,6 +648,7 @@ class _DictWrapper(object):
             factor: how much to multiply by
         """
         self.d[x] = self.d.get(x, 0) * factor
+        self._Invalidate()
 
     def Remove(self, x):
         """Removes a value.
@@ -375,14 +659,19 @@ class _DictWrapper(object):
             x: value to remove
         """
         del self.d[x]
+        self._Invalidate()
 
     def Total(self):
         """Returns the total of the frequencies/probabilities in the map."""
+        if self.IsArray():
+            return self.d.ps.sum().item()
         total = sum(self.d.values())
         return total
 
     def MaxLike(self):
         """Returns the largest frequency/probability in the map."""
+        if self.IsArray():
+            return self.d.ps.max().item()
         return max(self.d.values())
 
     def Largest(self, n=10):
@@ -434,6 +723,39 @@ class Hist(_DictWrapper):
         for val, freq in other.Items():
             self.Incr(val, -freq)
 
+    def Merge(self, other):
+        """Adds the frequencies from another histogram to this histogram.
+
+        other: Hist
+        """
+        self.Update(other)
+
+    def Update(self, obj):
+        """Adds a chunk of values to this histogram.
+
+        Counts the chunk with np.unique and merges the counts, so the
+        result is the same as building one Hist from all of the data.
+
+        obj: Hist, dict of frequencies, pandas Series, NumPy array or
+             iterable of values; NaNs in a Series are dropped
+        """
+        xs, freqs = _CountValues(obj)
+        if len(xs) == 0:
+            return
+
+        if self.IsArray():
+            self.d = _ArrayDict(
+                np.concatenate((self.d.xs, xs)),
+                np.concatenate((self.d.ps, freqs)),
+            )
+        else:
+            if isinstance(xs, np.ndarray):
+                xs, freqs = xs.tolist(), freqs.tolist()
+            d = self.d
+            for x, freq in zip(xs, freqs):
+                d[x] = d.get(x, 0) + freq
+        self._Invalidate()
+
 
 class Pmf(_DictWrapper):
     """Represents a probability mass function.
@@ -458,22 +780,68 @@ class Pmf(_DictWrapper):
         """Gets probabilities for a sequence of values."""
         return [self.Prob(x) for x in xs]
 
+    def _CumIndex(self):
+        """Gets the sorted values and cumulative probabilities.
+
+        The index is built the first time it is needed and reused
+        until the Pmf is modified.
+
+        Returns: pair of (list of sorted values, NumPy array of
+                 cumulative probabilities, not normalized)
+        """
+        if getattr(self, "_cum_index", None) is None:
+            if self.IsArray():
+                xs, ps = self.d.xs.tolist(), self.d.ps
+            elif len(self) > 0:
+                xs, ps = zip(*sorted(self.Items()))
+            else:
+                xs, ps = [], []
+            self._cum_index = list(xs), np.cumsum(ps, dtype=float)
+        return self._cum_index
+
     def Percentile(self, percentage):
         """Computes a percentile of a given Pmf.
 
-        Note: this is not super efficient.  If you are planning
-        to compute more than a few percentiles, compute the Cdf.
+        Uses the cumulative index, so the first call sorts the values
+        and later calls (until the Pmf changes) are binary searches.
 
         percentage: float 0-100
 
         returns: value from the Pmf
         """
-        p = percentage / 100
-        total = 0
-        for val, prob in sorted(self.Items()):
-            total += prob
-            if total >= p:
-                return val
+        return self.Percentiles([percentage])[0]
+
+    def Percentiles(self, percentages):
+        """Computes several percentiles of a given Pmf.
+
+        Like Percentile, compares with cumulative probabilities that are
+        not normalized; if the total is less than a percentage, the
+        corresponding result is None.
+
+        percentages: sequence of floats 0-100
+
+        returns: list of values from the Pmf
+        """
+        xs, cum = self._CumIndex()
+        ps = np.asarray(percentages, dtype=float) / 100
+        indices = np.searchsorted(cum, ps, side="left")
+        return [xs[i] if i < len(xs) else None for i in indices]
+
+    def _NormalizedValues(self, ps):
+        """Computes the inverse CDF at each of the probabilities ps.
+
+        Normalizes the cumulative probabilities, like MakeCdf, so the
+        results are the same as Cdf.Values.
+
+        ps: NumPy array of probabilities in the range [0, 1]
+
+        returns: list of values from the Pmf
+        """
+        xs, cum = self._CumIndex()
+        if len(xs) == 0:
+            raise ValueError("Pmf is empty")
+        indices = np.searchsorted(cum / cum[-1], ps, side="left")
+        return [xs[i] for i in indices]
 
     def ProbGreater(self, x):
         """Probability that a sample from this Pmf exceeds x.
@@ -484,6 +852,9 @@ class Pmf(_DictWrapper):
         """
         if isinstance(x, _DictWrapper):
             return PmfProbGreater(self, x)
+        elif self.IsArray():
+            i = np.searchsorted(self.d.xs, x, side="right")
+            return self.d.ps[i:].sum().item()
         else:
             t = [prob for (val, prob) in self.d.items() if val > x]
             return sum(t)
@@ -497,6 +868,9 @@ class Pmf(_DictWrapper):
         """
         if isinstance(x, _DictWrapper):
             return PmfProbLess(self, x)
+        elif self.IsArray():
+            i = np.searchsorted(self.d.xs, x, side="left")
+            return self.d.ps[:i].sum().item()
         else:
             t = [prob for (val, prob) in self.d.items() if val < x]
             return sum(t)
@@ -533,37 +907,47 @@ class Pmf(_DictWrapper):
             raise ValueError("Normalize: total probability is zero.")
 
         factor = fraction / total
+        self._Invalidate()
+        if self.IsArray():
+            self.d.ps = self.d.ps * factor
+            return total
+
         for x in self.d:
             self.d[x] *= factor
 
         return total
 
-    def Random(self):
+    def Sampler(self):
+        """Gets an AliasSampler for this Pmf.
+
+        The sampler is built the first time it is needed and reused
+        until the Pmf is modified.
+
+        Returns: AliasSampler
+        """
+        if getattr(self, "_sampler", None) is None:
+            self._sampler = AliasSampler(self.d.keys(), self.d.values())
+        return self._sampler
+
+    def Random(self, rng=None):
         """Chooses a random element from this PMF.
 
-        Note: this is not very efficient.  If you plan to call
-        this more than a few times, consider converting to a CDF.
+        rng: numpy.random.Generator, or None to use np.random
 
         Returns:
             float value from the Pmf
         """
-        target = random.random()
-        total = 0
-        for x, p in self.d.items():
-            total += p
-            if total >= target:
-                return x
+        return self.Sampler().Random(rng)
 
-        # we shouldn't get here
-        raise ValueError("Random: Pmf might not be normalized.")
-
-    def Sample(self, n):
+    def Sample(self, n, rng=None):
         """Generates a random sample from this distribution.
 
         n: int length of the sample
+        rng: numpy.random.Generator, or None to use np.random
+
         returns: NumPy array
         """
-        return self.MakeCdf().Sample(n)
+        return self.Sampler().Sample(n, rng)
 
     def Mean(self):
         """Computes the mean of a PMF.
@@ -571,6 +955,8 @@ class Pmf(_DictWrapper):
         Returns:
             float mean
         """
+        if self.IsArray():
+            return np.dot(self.d.ps, self.d.xs).item()
         return sum(p * x for x, p in self.Items())
 
     def Median(self):
@@ -579,7 +965,7 @@ class Pmf(_DictWrapper):
         Returns:
             float median
         """
-        return self.MakeCdf().Percentile(50)
+        return self._NormalizedValues([0.5])[0]
 
     def Var(self, mu=None):
         """Computes the variance of a PMF.
@@ -592,6 +978,9 @@ class Pmf(_DictWrapper):
         if mu is None:
             mu = self.Mean()
 
+        if self.IsArray():
+            ds = self.d.xs - mu
+            return np.dot(self.d.ps, ds**2).item()
         return sum(p * (x - mu) ** 2 for x, p in self.Items())
 
     def Expect(self, func):
@@ -618,6 +1007,10 @@ class Pmf(_DictWrapper):
 
         Returns: float probability
         """
+        if self.IsArray():
+            # in case of a tie, choose the largest value, like max does
+            i = len(self.d) - 1 - np.argmax(self.d.ps[::-1])
+            return self.d.xs[i].item()
         _, val = max((prob, val) for val, prob in self.Items())
         return val
 
@@ -639,8 +1032,20 @@ class Pmf(_DictWrapper):
         Returns:
             sequence of two floats, low and high
         """
-        cdf = self.MakeCdf()
-        return cdf.CredibleInterval(percentage)
+        return self.CredibleIntervals([percentage])[0]
+
+    def CredibleIntervals(self, percentages):
+        """Computes several central credible intervals.
+
+        percentages: sequence of floats between 0 and 100
+
+        Returns:
+            list of (low, high) pairs
+        """
+        probs = (1 - np.asarray(percentages, dtype=float) / 100) / 2
+        lows = self._NormalizedValues(probs)
+        highs = self._NormalizedValues(1 - probs)
+        return list(zip(lows, highs))
 
     def __add__(self, other):
         """Computes the Pmf of the sum of values drawn from self and other.
@@ -663,12 +1068,40 @@ class Pmf(_DictWrapper):
 
         returns: new Pmf
         """
+        arrays2 = _NumericArrays(other)
+        arrays1 = _NumericArrays(self)
+        if arrays1 is not None and arrays2 is not None:
+            xs, ps = _ConvolveArrays(*arrays1, *arrays2)
+            return MakePmfFromArrays(xs, ps, array=self.IsArray())
+
         pmf = Pmf()
         for v1, p1 in self.Items():
             for v2, p2 in other.Items():
                 pmf[v1 + v2] += p1 * p2
         return pmf
 
+    def SumOf(self, k):
+        """Computes the Pmf of the sum of k values drawn from this Pmf.
+
+        Uses repeated squaring, so it only takes O(log k) additions.
+
+        k: positive int
+
+        returns: new Pmf
+        """
+        if k < 1:
+            raise ValueError("SumOf: k must be a positive integer")
+
+        total = None
+        power = self
+        while True:
+            if k & 1:
+                total = power.Copy() if total is None else total.AddPmf(power)
+            k >>= 1
+            if k == 0:
+                return total
+            power = power.AddPmf(power)
+
     def AddConstant(self, other):
         """Computes the Pmf of the sum a constant and values from self.
 
@@ -703,6 +1136,13 @@ class Pmf(_DictWrapper):
 
         returns: new Pmf
         """
+        arrays2 = _NumericArrays(other)
+        arrays1 = _NumericArrays(self)
+        if arrays1 is not None and arrays2 is not None:
+            xs2, ps2 = arrays2
+            xs, ps = _ConvolveArrays(*arrays1, -xs2, ps2)
+            return MakePmfFromArrays(xs, ps, array=self.IsArray())
+
         pmf = Pmf()
         for v1, p1 in self.Items():
             for v2, p2 in other.Items():
@@ -728,6 +1168,12 @@ class Pmf(_DictWrapper):
 
         returns: new Pmf
         """
+        arrays2 = _NumericArrays(other)
+        arrays1 = _NumericArrays(self)
+        if arrays1 is not None and arrays2 is not None:
+            xs, ps = _OuterArrays(*arrays1, *arrays2, np.multiply)
+            return MakePmfFromArrays(xs, ps, array=self.IsArray())
+
         pmf = Pmf()
         for v1, p1 in self.Items():
             for v2, p2 in other.Items():
@@ -767,6 +1213,14 @@ class Pmf(_DictWrapper):
 
         returns: new Pmf
         """
+        arrays2 = _NumericArrays(other)
+        arrays1 = _NumericArrays(self)
+        # if other contains 0, use the loop so division by zero behaves
+        # the same way it always has
+        if arrays1 is not None and arrays2 is not None and np.all(arrays2[0]):
+            xs, ps = _OuterArrays(*arrays1, *arrays2, np.true_divide)
+            return MakePmfFromArrays(xs, ps, array=self.IsArray())
+
         pmf = Pmf()
         for v1, p1 in self.Items():
             for v2, p2 in other.Items():
@@ -781,10 +1235,125 @@ class Pmf(_DictWrapper):
         returns: new Cdf
         """
         cdf = self.MakeCdf()
-        cdf.ps **= k
+        cdf.ps = cdf.ps**k
         return cdf
 
 
+class AliasSampler(object):
+    """Draws values from a discrete distribution in constant time.
+
+    Uses the alias method: building the tables takes O(n) vectorized
+    operations; after that, each value is drawn with one uniform index
+    and one biased coin flip.
+
+    Attributes:
+        xs: NumPy array of values
+        prob: NumPy array of probabilities of keeping each index
+        alias: NumPy array of indices to use otherwise
+    """
+
+    def __init__(self, xs, ps):
+        """Builds the tables.
+
+        xs: sequence of values
+        ps: sequence of probabilities (need not be normalized)
+        """
+        if isinstance(xs, np.ndarray) and xs.ndim == 1:
+            self.xs = xs
+        else:
+            # keeps tuples and mixed types as they are
+            self.xs = _ValuesArray(list(xs))
+
+        if not isinstance(ps, np.ndarray):
+            ps = list(ps)
+        ps = np.asarray(ps, dtype=float)
+        n = len(ps)
+        total = ps.sum()
+        if n == 0 or not np.isfinite(total) or total <= 0 or np.any(ps < 0):
+            raise ValueError(
+                "AliasSampler: probabilities must be "
+                "non-negative with a positive total."
+            )
+
+        scaled = ps * n / total
+        self.prob = np.ones(n)
+        self.alias = np.arange(n)
+
+        small = np.flatnonzero(scaled < 1)
+        large = np.flatnonzero(scaled >= 1)
+        if len(small) == 0 or len(large) == 0:
+            return
+
+        # Same tables as a two-pointer pass that gives each small index,
+        # in order, to the current large index, which moves on to the
+        # next large index once its mass drops below 1.  Where the
+        # cumulative deficits of the small indices cross the cumulative
+        # excesses of the large ones tells which large index covers
+        # each small one and how much each large index keeps.
+        deficits = 1 - scaled[small]
+        cum_deficit = np.cumsum(deficits)
+        cum_excess = np.cumsum(scaled[large] - 1)
+
+        # the start of each deficit has to be the previous cumulative
+        # sum exactly, or ties between deficits and excesses come out
+        # differently here and in the searchsorted for k below
+        starts = np.concatenate([[0.0], cum_deficit[:-1]])
+        j = np.searchsorted(cum_excess, starts, side="left")
+        self.prob[small] = scaled[small]
+        self.alias[small] = large[np.minimum(j, len(large) - 1)]
+
+        # large index j runs out at the first small index whose
+        # cumulative deficit passes cum_excess[j]; the last one never
+        # does, up to floating-point error
+        k = np.searchsorted(cum_deficit, cum_excess[:-1], side="right")
+        spent = np.flatnonzero(k < len(small))
+        overshoot = cum_deficit[k[spent]] - cum_excess[spent]
+        self.prob[large[spent]] = np.clip(1 - overshoot, 0, 1)
+        self.alias[large[spent]] = large[spent + 1]
+
+    def __len__(self):
+        return len(self.xs)
+
+    def Indices(self, n, rng=None):
+        """Draws a sample of indices into xs.
+
+        n: int sample size
+        rng: numpy.random.Generator, or None to use np.random
+
+        returns: NumPy array of int
+        """
+        if rng is None:
+            rng = np.random
+        k = len(self.prob)
+        i = np.minimum((rng.random(n) * k).astype(np.int64), k - 1)
+        keep = rng.random(n) < self.prob[i]
+        return np.where(keep, i, self.alias[i])
+
+    def Sample(self, n, rng=None):
+        """Draws a sample of values.
+
+        n: int sample size
+        rng: numpy.random.Generator, or None to use np.random
+
+        returns: NumPy array
+        """
+        return self.xs[self.Indices(n, rng)]
+
+    def Random(self, rng=None):
+        """Draws a single value.
+
+        rng: numpy.random.Generator, or None to use np.random
+        """
+        if rng is None:
+            rng = np.random
+        k = len(self.prob)
+        i = min(int(rng.random() * k), k - 1)
+        if rng.random() >= self.prob[i]:
+            i = self.alias[i]
+        x = self.xs[i]
+        return x.item() if isinstance(x, np.generic) else x
+
+
 class Joint(Pmf):
     """Represents a joint distribution.
 
@@ -847,6 +1416,15 @@ class Joint(Pmf):
 
         return interval
 
+    def MakeGridJoint(self, label=None):
+        """Makes a GridJoint with the same probabilities.
+
+        label: string label for the new GridJoint
+
+        Returns: GridJoint
+        """
+        return MakeGridJointFromJoint(self, label=label)
+
 
 def MakeJoint(pmf1, pmf2):
     """Joint distribution of values from pmf1 and pmf2.
@@ -867,85 +1445,654 @@ def MakeJoint(pmf1, pmf2):
     return joint
 
 
-def MakeHistFromList(t, label=None):
-    """Makes a histogram from an unsorted sequence of values.
-
-    Args:
-        t: sequence of numbers
-        label: string label for this histogram
+class GridJoint(object):
+    """Represents a joint distribution on a regular grid.
 
-    Returns:
-        Hist object
+    Stores one array of values per variable (the axes) and an
+    N-dimensional array of probabilities, so marginals and conditionals
+    are sums and slices rather than loops over the cells.
     """
-    return Hist(t, label=label)
-
 
-def MakeHistFromDict(d, label=None):
-    """Makes a histogram from a map from values to frequencies.
+    def __init__(self, axes, ps=None, label=None):
+        """Initializes the distribution.
 
-    Args:
-        d: dictionary that maps values to frequencies
-        label: string label for this histogram
+        axes: sequence of sequences, the values of each variable
+        ps: array of probabilities with one dimension per axis;
+            if None, the distribution is uniform
+        label: string label
+        """
+        self.axes = [np.asarray(axis) for axis in axes]
+        shape = tuple(len(axis) for axis in self.axes)
 
-    Returns:
-        Hist object
-    """
-    return Hist(d, label)
+        if ps is None:
+            ps = np.ones(shape) / np.prod(shape)
+        ps = np.array(ps, dtype=float)
+        if ps.shape != shape:
+            raise ValueError(
+                "ps has shape %s; axes have shape %s" % (ps.shape, shape)
+            )
 
+        self.ps = ps
+        self.label = label if label is not None else DEFAULT_LABEL
 
-def MakePmfFromList(t, label=None):
-    """Makes a PMF from an unsorted sequence of values.
+    def __len__(self):
+        return self.ps.size
 
-    Args:
-        t: sequence of numbers
-        label: string label for this PMF
+    def __iter__(self):
+        return iter(self.Values())
 
-    Returns:
-        Pmf object
-    """
-    return Pmf(t, label=label)
+    def __contains__(self, vs):
+        try:
+            self._Index(vs)
+        except KeyError:
+            return False
+        return True
 
+    def __getitem__(self, vs):
+        return self.Prob(vs)
 
-def MakePmfFromDict(d, label=None):
-    """Makes a PMF from a map from values to probabilities.
+    def __setitem__(self, vs, prob):
+        self.Set(vs, prob)
 
-    Args:
-        d: dictionary that maps values to probabilities
-        label: string label for this PMF
+    def Copy(self, label=None):
+        """Returns a copy.
 
-    Returns:
-        Pmf object
-    """
-    return Pmf(d, label=label)
+        label: string label for the new GridJoint
+        """
+        label = label if label is not None else self.label
+        return GridJoint(self.axes, self.ps, label=label)
+
+    def _AxisIndex(self, i, val):
+        """Finds the index of val in axis i; raises KeyError if absent."""
+        indices = np.flatnonzero(self.axes[i] == val)
+        if len(indices) == 0:
+            raise KeyError(val)
+        return indices[0]
+
+    def _Index(self, vs):
+        """Converts a tuple of values to a tuple of array indices."""
+        if len(vs) != len(self.axes):
+            raise KeyError(vs)
+        return tuple(self._AxisIndex(i, val) for i, val in enumerate(vs))
+
+    def Prob(self, vs, default=0):
+        """Gets the probability associated with a tuple of values.
+
+        vs: tuple of values, one per axis
+        default: value to return if the tuple is not on the grid
+        """
+        try:
+            return self.ps[self._Index(vs)]
+        except KeyError:
+            return default
 
+    def Set(self, vs, prob):
+        """Sets the probability associated with a tuple of values.
 
-def MakePmfFromItems(t, label=None):
-    """Makes a PMF from a sequence of value-probability pairs
+        vs: tuple of values, one per axis
+        prob: float probability
+        """
+        self.ps[self._Index(vs)] = prob
 
-    Args:
-        t: sequence of value-probability pairs
-        label: string label for this PMF
+    def Mult(self, vs, factor):
+        """Scales the probability associated with a tuple of values.
 
-    Returns:
-        Pmf object
-    """
-    return Pmf(dict(t), label=label)
+        vs: tuple of values, one per axis
+        factor: how much to multiply by
+        """
+        self.ps[self._Index(vs)] *= factor
 
+    def Values(self):
+        """Returns a list of value tuples, in the order of ps.ravel()."""
+        return list(itertools.product(*[axis.tolist() for axis in self.axes]))
 
-def MakePmfFromHist(hist, label=None):
-    """Makes a normalized PMF from a Hist object.
+    def Items(self):
+        """Returns a list of (value tuple, probability) pairs."""
+        return list(zip(self.Values(), self.ps.ravel().tolist()))
 
-    Args:
-        hist: Hist object
-        label: string label
+    def Total(self):
+        """Returns the total of the probabilities."""
+        return self.ps.sum()
 
-    Returns:
-        Pmf object
-    """
-    if label is None:
-        label = hist.label
+    def Normalize(self, fraction=1):
+        """Normalizes so the probabilities add up to fraction.
 
-    return Pmf(hist, label=label)
+        fraction: what the total should be after normalization
+
+        Returns: the total probability before normalizing
+        """
+        total = self.Total()
+        if total == 0:
+            raise ValueError("Normalize: total probability is zero.")
+
+        self.ps *= fraction / total
+        return total
+
+    def Marginal(self, i, label=None):
+        """Gets the marginal distribution of the indicated variable.
+
+        i: index of the variable we want
+
+        Returns: Pmf
+        """
+        others = tuple(j for j in range(self.ps.ndim) if j != i)
+        ps = self.ps.sum(axis=others)
+        return Pmf(dict(zip(self.axes[i].tolist(), ps.tolist())), label=label)
+
+    def Conditional(self, i, j, val, label=None):
+        """Gets the conditional distribution of the indicated variable.
+
+        Distribution of vs[i], conditioned on vs[j] = val.
+
+        i: index of the variable we want
+        j: which variable is conditioned on
+        val: the value the jth variable has to have
+
+        Returns: Pmf
+        """
+        index = [slice(None)] * self.ps.ndim
+        index[j] = self._AxisIndex(j, val)
+        ps = self.ps[tuple(index)]
+
+        # removing axis j shifts the later axes down by one
+        k = i if i < j else i - 1
+        others = tuple(m for m in range(ps.ndim) if m != k)
+        ps = ps.sum(axis=others)
+
+        pmf = Pmf(dict(zip(self.axes[i].tolist(), ps.tolist())), label=label)
+        pmf.Normalize()
+        return pmf
+
+    def MaxLikeInterval(self, percentage=90):
+        """Returns the maximum-likelihood credible interval.
+
+        If percentage=90, computes a 90% CI containing the values
+        with the highest likelihoods.
+
+        percentage: float between 0 and 100
+
+        Returns: list of value tuples
+        """
+        flat = self.ps.ravel()
+        order = np.argsort(flat, kind="stable")[::-1]
+        cumulative = np.cumsum(flat[order])
+        n = np.searchsorted(cumulative, percentage / 100) + 1
+        n = min(n, len(order))
+
+        indices = np.unravel_index(order[:n], self.ps.shape)
+        columns = [
+            axis[index].tolist() for axis, index in zip(self.axes, indices)
+        ]
+        return list(zip(*columns))
+
+    def MakeJoint(self, label=None):
+        """Makes a Joint with one entry per cell of the grid.
+
+        label: string label for the new Joint
+
+        Returns: Joint
+        """
+        label = label if label is not None else self.label
+        return Joint(dict(self.Items()), label=label)
+
+
+def MakeGridJoint(*pmfs, label=None):
+    """Joint distribution of values from several PMFs, on a grid.
+
+    Assumes that the PMFs represent independent random variables.
+
+    pmfs: Pmf objects, one per axis
+    label: string label
+
+    Returns: GridJoint
+    """
+    axes = []
+    ps = np.ones(())
+    for pmf in pmfs:
+        xs, probs = zip(*sorted(pmf.Items()))
+        axes.append(xs)
+        ps = np.multiply.outer(ps, probs)
+    return GridJoint(axes, ps, label=label)
+
+
+def MakeGridJointFromJoint(joint, label=None):
+    """Makes a GridJoint from a Joint.
+
+    The axes are the distinct values of each variable; cells with no
+    entry in the Joint get probability 0.
+
+    joint: Joint whose values are tuples of the same length
+    label: string label
+
+    Returns: GridJoint
+    """
+    items = list(joint.Items())
+    if len(items) == 0:
+        raise ValueError("MakeGridJointFromJoint: joint is empty.")
+
+    keys, probs = zip(*items)
+    axes = []
+    indices = []
+    for column in zip(*keys):
+        axis, index = np.unique(np.asarray(column), return_inverse=True)
+        axes.append(axis)
+        indices.append(index.ravel())
+
+    ps = np.zeros(tuple(len(axis) for axis in axes))
+    np.add.at(ps, tuple(indices), probs)
+    label = label if label is not None else joint.label
+    return GridJoint(axes, ps, label=label)
+
+
+def _NumericArrays(dist):
+    """Gets the values and probabilities of a distribution as arrays.
+
+    dist: Hist or Pmf
+
+    returns: pair of NumPy arrays (xs, ps), or None if the values are not
+             numbers (in which case callers fall back to Python loops)
+    """
+    if isinstance(dist, _DictWrapper) and dist.IsArray():
+        xs, ps = dist.d.xs, dist.d.ps
+    else:
+        items = list(dist.Items())
+        if len(items) == 0:
+            return None
+        xs, ps = zip(*items)
+        try:
+            xs, ps = np.asarray(xs), np.asarray(ps)
+        except ValueError:
+            return None
+
+    if len(xs) == 0 or xs.ndim != 1:
+        return None
+    if xs.dtype.kind not in "iuf" or ps.dtype.kind not in "iuf":
+        return None
+    return _Widen(xs), ps
+
+
+def _Widen(xs):
+    """Converts numeric values to int64 or float64.
+
+    Arithmetic on small types like int8 or uint8 would wrap around.
+
+    xs: NumPy array of numbers
+
+    returns: NumPy array (xs itself if it is already 64-bit)
+    """
+    if xs.dtype.kind in "iu" and xs.dtype != np.uint64:
+        return xs.astype(np.int64, copy=False)
+    return xs.astype(np.float64, copy=False)
+
+
+def _MakeFromArrays(cls, xs, ps, label=None, array=False):
+    """Makes a Hist or Pmf from arrays, adding up duplicate values.
+
+    cls: Hist or Pmf
+    xs: NumPy array of values
+    ps: NumPy array of freqs/probs
+    label: string label
+    array: boolean, whether the new object is array-backed
+
+    returns: cls object
+    """
+    dw = cls(label=label)
+    try:
+        d = _ArrayDict(xs, ps)
+    except TypeError:
+        # the values are not sortable
+        if array:
+            raise
+        for x, p in zip(np.asarray(xs).tolist(), np.asarray(ps).tolist()):
+            dw.d[x] = dw.d.get(x, 0) + p
+        return dw
+
+    if array:
+        dw.d = d
+    else:
+        dw.d = dict(zip(d.xs.tolist(), d.ps.tolist()))
+    return dw
+
+
+def MakePmfFromArrays(xs, ps, label=None, array=False):
+    """Makes an unnormalized Pmf from arrays, adding up duplicate values.
+
+    Restores a Pmf from the result of ToArrays.
+
+    xs: NumPy array of values
+    ps: NumPy array of probabilities
+    label: string label
+    array: boolean, whether the new Pmf is array-backed
+
+    returns: Pmf
+    """
+    return _MakeFromArrays(Pmf, xs, ps, label, array)
+
+
+def MakeHistFromArrays(xs, ps, label=None, array=False):
+    """Makes a Hist from arrays, adding up duplicate values.
+
+    Restores a Hist from the result of ToArrays.
+
+    xs: NumPy array of values
+    ps: NumPy array of frequencies
+    label: string label
+    array: boolean, whether the new Hist is array-backed
+
+    returns: Hist
+    """
+    return _MakeFromArrays(Hist, xs, ps, label, array)
+
+
+def MakeCdfFromArrays(xs, ps, label=None):
+    """Makes a Cdf from arrays of values and cumulative probabilities.
+
+    Restores a Cdf from the result of Cdf.ToArrays.
+
+    xs: sorted NumPy array of values
+    ps: NumPy array of cumulative probabilities
+    label: string label
+
+    returns: Cdf
+    """
+    return Cdf(np.asarray(xs), np.asarray(ps), label=label)
+
+
+def MergeHists(hists, label=None, array=False):
+    """Adds up the frequencies in a sequence of histograms.
+
+    hists: iterable of Hist
+    label: string label for the result
+    array: boolean, whether the result is array-backed
+
+    returns: Hist
+    """
+    hist = Hist(label=label, array=array)
+    for other in hists:
+        hist.Merge(other)
+    return hist
+
+
+def _HistArraysFromFile(filename, reader, column):
+    """Reads a file and counts its values; runs in a worker process.
+
+    filename: string
+    reader: function that takes a filename and returns data
+    column: name of the column to count, or None
+
+    returns: dict from Hist.ToArrays
+    """
+    data = reader(filename)
+    if column is not None:
+        data = data[column]
+    elif isinstance(data, pandas.DataFrame):
+        raise ValueError(
+            "MakeHistFromFiles: column is required "
+            "when reader returns a DataFrame"
+        )
+    hist = Hist()
+    hist.Update(data)
+    return hist.ToArrays()
+
+
+def MakeHistFromFiles(
+    filenames,
+    reader=None,
+    column=None,
+    processes=None,
+    label=None,
+    array=False,
+):
+    """Makes a histogram of the values in several files, in parallel.
+
+    Each worker process reads one file at a time and sends back the
+    compact arrays from Hist.ToArrays, which are then merged.
+
+    filenames: sequence of strings
+    reader: function that takes a filename and returns a Series,
+            DataFrame or sequence; must be picklable (defined at
+            module level); default is pandas.read_csv
+    column: name of the column to count if reader returns a DataFrame
+    processes: number of worker processes; default is the number of CPUs
+    label: string label for the result
+    array: boolean, whether the result is array-backed
+
+    returns: Hist
+    """
+    if reader is None:
+        if column is None:
+            raise ValueError(
+                "MakeHistFromFiles: column is required "
+                "with the default reader"
+            )
+        reader = pandas.read_csv
+
+    n = len(filenames)
+    with ProcessPoolExecutor(processes) as executor:
+        results = executor.map(
+            _HistArraysFromFile, filenames, [reader] * n, [column] * n
+        )
+        hists = (MakeHistFromArrays(res["xs"], res["ps"]) for res in results)
+        return MergeHists(hists, label=label, array=array)
+
+
+def _OuterArrays(xs1, ps1, xs2, ps2, ufunc):
+    """Combines every pair of values from two distributions.
+
+    xs1, ps1: values and probabilities of the first distribution
+    xs2, ps2: values and probabilities of the second distribution
+    ufunc: NumPy ufunc that combines values, like np.add
+
+    returns: pair of NumPy arrays (xs, ps), with duplicate values
+    """
+    xs = ufunc.outer(xs1, xs2).ravel()
+    ps = np.outer(ps1, ps2).ravel()
+    return xs, ps
+
+
+def _GridStep(xs1, xs2):
+    """Finds a step size such that both arrays lie on a regular grid.
+
+    Integer values (including floats with integer values) lie on a grid
+    whose step is the GCD of the differences.  Other floats qualify if
+    both arrays are evenly spaced with the same step.
+
+    returns: step size, or None if there is no common grid
+    """
+    xs = np.concatenate((xs1, xs2))
+    if not np.all(np.isfinite(xs)):
+        return None
+
+    if np.all(xs == np.round(xs)) and np.all(np.abs(xs) < 2**53):
+        diffs = np.concatenate((xs1 - xs1.min(), xs2 - xs2.min()))
+        step = np.gcd.reduce(diffs.astype(np.int64))
+        return max(int(step), 1)
+
+    steps = [np.diff(np.sort(a)) for a in (xs1, xs2) if len(a) > 1]
+    steps = np.concatenate(steps) if steps else np.asarray([])
+    if len(steps) == 0 or steps[0] <= 0:
+        return None
+    if np.allclose(steps, steps[0], rtol=1e-9, atol=0):
+        return steps[0]
+    return None
+
+
+def _ConvolveArrays(xs1, ps1, xs2, ps2):
+    """Computes the distribution of the sum of two independent variables.
+
+    If both supports lie on a common grid that is not much bigger than
+    the number of pairs, uses a convolution (by FFT for long grids);
+    otherwise adds up all pairs of values.
+
+    For floating-point grids, the resulting values are computed from the
+    grid, so they can differ from v1 + v2 in the last bit.
+
+    xs1, ps1: values and probabilities of the first distribution
+    xs2, ps2: values and probabilities of the second distribution
+
+    returns: pair of NumPy arrays (xs, ps), possibly with duplicate values
+    """
+    step = _GridStep(xs1, xs2)
+    if step is None:
+        return _OuterArrays(xs1, ps1, xs2, ps2, np.add)
+
+    low1, low2 = xs1.min(), xs2.min()
+    i1 = np.rint((xs1 - low1) / step).astype(np.int64)
+    i2 = np.rint((xs2 - low2) / step).astype(np.int64)
+    n1, n2 = i1.max() + 1, i2.max() + 1
+    if n1 + n2 > len(xs1) * len(xs2) + 100:
+        # the grid is sparse; it's cheaper to add up the pairs
+        return _OuterArrays(xs1, ps1, xs2, ps2, np.add)
+
+    ps = _Convolve(np.bincount(i1, ps1, n1), np.bincount(i2, ps2, n2))
+
+    # find the values that can actually occur
+    counts1 = np.bincount(i1, minlength=n1)
+    counts2 = np.bincount(i2, minlength=n2)
+    counts = _Convolve(counts1, counts2)
+    support = counts > 0.5
+
+    xs = low1 + low2 + step * np.arange(len(ps))
+    if xs1.dtype.kind in "iu" and xs2.dtype.kind in "iu":
+        xs = xs.astype(np.result_type(xs1, xs2))
+    return xs[support], np.maximum(ps[support], 0)
+
+
+def _Convolve(a, b):
+    """Convolves two arrays, using FFT if they are long.
+
+    a, b: NumPy arrays
+
+    returns: NumPy array with length len(a) + len(b) - 1
+    """
+    if len(a) * len(b) < 100000:
+        return np.convolve(a, b)
+    return signal.fftconvolve(a, b)
+
+
+def MakeHistFromList(t, label=None):
+    """Makes a histogram from an unsorted sequence of values.
+
+    Args:
+        t: sequence of numbers
+        label: string label for this histogram
+
+    Returns:
+        Hist object
+    """
+    return Hist(t, label=label)
+
+
+def MakeHistFromDict(d, label=None):
+    """Makes a histogram from a map from values to frequencies.
+
+    Args:
+        d: dictionary that maps values to frequencies
+        label: string label for this histogram
+
+    Returns:
+        Hist object
+    """
+    return Hist(d, label)
+
+
+def MakeHistFromChunks(chunks, column=None, label=None, array=False):
+    """Makes a histogram from a sequence of chunks, one at a time.
+
+    Works with chunked readers like pandas.read_csv(..., chunksize=n),
+    so the whole dataset never has to be in memory.
+
+    Args:
+        chunks: iterable of sequences, Series or DataFrames
+        column: name of the column to count if the chunks are DataFrames
+        label: string label for this histogram
+        array: boolean, whether the Hist is array-backed
+
+    Returns:
+        Hist object
+    """
+    hist = Hist(label=label, array=array)
+    for chunk in chunks:
+        if column is not None:
+            chunk = chunk[column]
+        elif isinstance(chunk, pandas.DataFrame):
+            raise ValueError(
+                "MakeHistFromChunks: column is required "
+                "for DataFrame chunks"
+            )
+        hist.Update(chunk)
+    return hist
+
+
+def MakePmfFromChunks(chunks, column=None, label=None, array=False):
+    """Makes a PMF from a sequence of chunks, one at a time.
+
+    Args:
+        chunks: iterable of sequences, Series or DataFrames
+        column: name of the column to count if the chunks are DataFrames
+        label: string label for this PMF
+        array: boolean, whether the Pmf is array-backed
+
+    Returns:
+        Pmf object
+    """
+    hist = MakeHistFromChunks(chunks, column, label, array)
+    return Pmf(hist, array=array)
+
+
+def MakePmfFromList(t, label=None):
+    """Makes a PMF from an unsorted sequence of values.
+
+    Args:
+        t: sequence of numbers
+        label: string label for this PMF
+
+    Returns:
+        Pmf object
+    """
+    return Pmf(t, label=label)
+
+
+def MakePmfFromDict(d, label=None):
+    """Makes a PMF from a map from values to probabilities.
+
+    Args:
+        d: dictionary that maps values to probabilities
+        label: string label for this PMF
+
+    Returns:
+        Pmf object
+    """
+    return Pmf(d, label=label)
+
+
+def MakePmfFromItems(t, label=None):
+    """Makes a PMF from a sequence of value-probability pairs
+
+    Args:
+        t: sequence of value-probability pairs
+        label: string label for this PMF
+
+    Returns:
+        Pmf object
+    """
+    return Pmf(dict(t), label=label)
+
+
+def MakePmfFromHist(hist, label=None):
+    """Makes a normalized PMF from a Hist object.
+
+    Args:
+        hist: Hist object
+        label: string label
+
+    Returns:
+        Pmf object
+    """
+    if label is None:
+        label = hist.label
+
+    return Pmf(hist, label=label)
 
 
 def MakeMixture(metapmf, label="mix"):
@@ -957,6 +2104,14 @@ def MakeMixture(metapmf, label="mix"):
 
     Returns: Pmf object.
     """
+    items = list(metapmf.Items())
+    arrays = [_NumericArrays(pmf) for pmf, _ in items]
+    if items and all(a is not None for a in arrays):
+        xs = np.concatenate([xs for xs, _ in arrays])
+        weights = [p1 for _, p1 in items]
+        ps = np.concatenate([p1 * ps for (_, ps), p1 in zip(arrays, weights)])
+        return MakePmfFromArrays(xs, ps, label=label)
+
     mix = Pmf(label=label)
     for pmf, p1 in metapmf.Items():
         for x, p2 in pmf.Items():
@@ -1025,6 +2180,13 @@ class Cdf:
             self.ps = copy.copy(obj.ps)
             return
 
+        if isinstance(obj, _DictWrapper) and obj.IsArray():
+            self.xs = obj.d.xs.copy()
+            self.ps = np.cumsum(obj.d.ps, dtype=float)
+            if len(self.ps):
+                self.ps /= self.ps[-1]
+            return
+
         if isinstance(obj, _DictWrapper):
             dw = obj
         else:
@@ -1088,6 +2250,40 @@ class Cdf:
             label = self.label
         return Cdf(list(self.xs), list(self.ps), label=label)
 
+    def ToArrays(self):
+        """Returns the values and cumulative probabilities as NumPy arrays.
+
+        MakeCdfFromArrays restores the Cdf.
+
+        returns: dict with keys xs, ps and label
+        """
+        return dict(
+            xs=np.asarray(self.xs), ps=np.asarray(self.ps), label=self.label
+        )
+
+    def Merge(self, other, count=1, other_count=1):
+        """Combines this Cdf with another, weighted by sample sizes.
+
+        If this Cdf summarizes count values and the other summarizes
+        other_count values, the result is the Cdf of all of the values.
+
+        other: Cdf
+        count: number of values (or relative weight) of this Cdf
+        other_count: number of values (or relative weight) of other
+
+        returns: new Cdf
+        """
+        if len(other) == 0 or other_count == 0:
+            return self.Copy()
+        if len(self) == 0 or count == 0:
+            return other.Copy(label=self.label)
+
+        xs = np.union1d(self.xs, other.xs)
+        ps1 = self.Probs(xs)
+        ps2 = other.Probs(xs)
+        ps = (count * ps1 + other_count * ps2) / (count + other_count)
+        return Cdf(xs, ps, label=self.label)
+
     def MakePmf(self, label=None):
         """Makes a Pmf."""
         if label is None:
@@ -1124,6 +2320,22 @@ class Cdf:
         new.xs = new.xs * factor
         return new
 
+    def _Lists(self):
+        """Gets xs and ps as Python lists, for fast scalar lookups.
+
+        bisect on a list is much faster than on a NumPy array.  The lists
+        are cached and rebuilt if xs or ps is rebound; methods that change
+        a Cdf make new arrays rather than modifying them in place.
+
+        Returns: pair of lists
+        """
+        cache = getattr(self, "_lists", None)
+        if cache is None or cache[0] is not self.xs or cache[1] is not self.ps:
+            xs, ps = np.asarray(self.xs), np.asarray(self.ps, dtype=float)
+            cache = self.xs, self.ps, xs.tolist(), ps.tolist()
+            self._lists = cache
+        return cache[2], cache[3]
+
     def Prob(self, x):
         """Returns CDF(x), the probability that corresponds to value x.
 
@@ -1131,29 +2343,48 @@ class Cdf:
             x: number
 
         Returns:
-            float probability
+            float probability; NaN if x is NaN
         """
-        if x < self.xs[0]:
-            return 0
-        index = bisect.bisect(self.xs, x)
-        p = self.ps[index - 1]
-        return p
+        if x != x:
+            return np.nan
+        xs, ps = self._Lists()
+        index = bisect.bisect(xs, x)
+        return ps[index - 1] if index > 0 else 0.0
 
     def Probs(self, xs):
         """Gets probabilities for a sequence of values.
 
-        xs: any sequence that can be converted to NumPy array
+        Agrees with Prob: values below the smallest value get 0, and NaNs
+        get NaN.
 
-        returns: NumPy array of cumulative probabilities
+        xs: any sequence that can be converted to NumPy array, or a scalar
+
+        returns: NumPy array of cumulative probabilities (float if xs
+                 is a scalar)
         """
         xs = np.asarray(xs)
         index = np.searchsorted(self.xs, xs, side="right")
-        ps = self.ps[index - 1]
-        ps[xs < self.xs[0]] = 0
-        return ps
+        ps = np.concatenate(([0.0], np.asarray(self.ps, dtype=float)))
+        res = ps[index]
+
+        if xs.dtype.kind in "fc":
+            res = np.where(np.isnan(xs), np.nan, res)
+        return float(res) if np.ndim(res) == 0 else res
 
     ProbArray = Probs
 
+    def Lookup(self, values):
+        """Computes CDF(x) for each value in a Series or array.
+
+        values: pandas Series, NumPy array or sequence
+
+        returns: Series with the same index as values, or NumPy array
+        """
+        if isinstance(values, pandas.Series):
+            ps = self.Probs(values.values)
+            return pandas.Series(ps, index=values.index, name=values.name)
+        return self.Probs(values)
+
     def Value(self, p):
         """Returns InverseCDF(p), the value that corresponds to probability p.
 
@@ -1163,11 +2394,12 @@ class Cdf:
         Returns:
             number value
         """
-        if p < 0 or p > 1:
+        if not 0 <= p <= 1:
             raise ValueError("Probability p must be in range [0, 1]")
 
-        index = bisect.bisect_left(self.ps, p)
-        return self.xs[index]
+        xs, ps = self._Lists()
+        index = bisect.bisect_left(ps, p)
+        return xs[index]
 
     def Values(self, ps=None):
         """Returns InverseCDF(p), the value that corresponds to probability p.
@@ -1184,7 +2416,7 @@ class Cdf:
             return self.xs
 
         ps = np.asarray(ps)
-        if np.any(ps < 0) or np.any(ps > 1):
+        if not np.all((ps >= 0) & (ps <= 1)):
             raise ValueError("Probability p must be in range [0, 1]")
 
         index = np.searchsorted(self.ps, ps, side="left")
@@ -1283,9 +2515,50 @@ class Cdf:
         from the previous value in a significant digit, where the number
         of significant digits is determined by multiplier.  The
         default is 1000, which keeps log10(1000) = 3 significant digits.
+
+        The last entry is always kept.  Each dropped entry has the same
+        rounded percentile as the entry kept before it, so Prob is off
+        by less than 1/multiplier.
+
+        returns: new Cdf
         """
-        # TODO(write this method)
-        raise UnimplementedMethodException()
+        ps = np.asarray(self.ps)
+        if len(ps) == 0:
+            return self.Copy()
+
+        levels = np.floor(ps * multiplier)
+        keep = np.empty(len(ps), dtype=bool)
+        keep[0] = True
+        keep[1:] = levels[1:] != levels[:-1]
+        keep[-1] = True
+
+        return Cdf(np.asarray(self.xs)[keep], ps[keep], label=self.label)
+
+    def Compress(self, max_points=None, max_error=None):
+        """Makes a smaller Cdf that approximates this one.
+
+        Drops entries whose percentile rounds to the same level as the
+        previous entry (see _Round), with the levels chosen so the result
+        has at most max_points entries, or so Prob is off by less than
+        max_error, whichever gives the smaller Cdf.
+
+        max_points: int, at least 3
+        max_error: float probability
+
+        returns: new Cdf
+        """
+        multiplier = np.inf
+        if max_points is not None:
+            if max_points < 3:
+                raise ValueError("Compress: max_points must be at least 3")
+            if len(self) <= max_points:
+                return self.Copy()
+            multiplier = max_points - 2
+        if max_error is not None:
+            multiplier = min(multiplier, 1 / max_error)
+        if multiplier == np.inf:
+            return self.Copy()
+        return self._Round(multiplier)
 
     def Render(self, **options):
         """Generates a sequence of points suitable for plotting.
@@ -1320,10 +2593,258 @@ class Cdf:
         returns: new Cdf
         """
         cdf = self.Copy()
-        cdf.ps **= k
+        cdf.ps = cdf.ps**k
         return cdf
 
 
+class ApproxCdf(object):
+    """Represents an approximate CDF with a bounded-memory sketch.
+
+    Uses a KLL sketch: a stack of compactors, where level h holds
+    sorted values that each stand for 2**h original values.  When a
+    level is full, half of its values, alternating from a random offset,
+    move up a level.  The sketch keeps O(k) values no matter how many
+    it has seen, and the rank error is roughly proportional to 1/k.
+
+    Queries use the same methods as Cdf, evaluated on a Cdf built from
+    the weighted values in the sketch.
+
+    Attributes:
+        k: size parameter; larger is more accurate and uses more memory
+        n: number of values seen
+        label: string used as a graph label.
+    """
+
+    def __init__(self, values=None, k=200, label=None, seed=None):
+        """Initializes.
+
+        values: sequence of numbers to add, or None
+        k: int size parameter, at least 8
+        label: string label
+        seed: int seed for the random offsets; if None, the offsets
+              come from np.random, so RandomSeed makes them reproducible
+        """
+        if k < 8:
+            raise ValueError("ApproxCdf: k must be at least 8")
+
+        self.k = k
+        self.n = 0
+        self.label = label if label is not None else DEFAULT_LABEL
+        if seed is None:
+            seed = np.random.randint(2**63, dtype=np.int64)
+        self.rng = np.random.default_rng(seed)
+        self.compactors = [np.array([])]
+        self.cdf = None
+
+        if values is not None:
+            self.Update(values)
+
+    def __len__(self):
+        return len(self._Cdf())
+
+    def __getitem__(self, x):
+        return self.Prob(x)
+
+    def _Capacity(self, h):
+        """Returns the number of values level h can hold."""
+        depth = len(self.compactors) - h - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def Size(self):
+        """Returns the number of values stored in the sketch."""
+        return sum(len(items) for items in self.compactors)
+
+    def Update(self, values):
+        """Adds a chunk of values to the sketch.
+
+        values: NumPy array, pandas Series or sequence of numbers;
+                NaNs are dropped
+        """
+        if isinstance(values, pandas.Series):
+            values = values.values
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+
+        self.compactors[0] = np.concatenate((self.compactors[0], values))
+        self.n += len(values)
+        self._Compress()
+
+    def Merge(self, other):
+        """Adds the values summarized by another ApproxCdf to this one.
+
+        other: ApproxCdf
+        """
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append(np.array([]))
+        for h, items in enumerate(other.compactors):
+            self.compactors[h] = np.concatenate((self.compactors[h], items))
+        self.n += other.n
+        self._Compress()
+
+    def _Compress(self):
+        """Compacts full levels until the sketch is within capacity."""
+        self.cdf = None
+        while True:
+            for h, items in enumerate(self.compactors):
+                if len(items) >= self._Capacity(h):
+                    break
+            else:
+                return
+
+            if h + 1 == len(self.compactors):
+                self.compactors.append(np.array([]))
+
+            # promote every other value of an even number of sorted values
+            items = np.sort(items)
+            m = len(items) - len(items) % 2
+            offset = self.rng.integers(2)
+            promoted = items[offset:m:2]
+            self.compactors[h + 1] = np.concatenate(
+                (self.compactors[h + 1], promoted)
+            )
+            self.compactors[h] = items[m:]
+
+    def _Cdf(self):
+        """Returns the Cdf of the weighted values, building it if needed."""
+        if self.cdf is None:
+            self.cdf = self.MakeCdf()
+        return self.cdf
+
+    def MakeCdf(self, label=None):
+        """Makes a Cdf from the weighted values in the sketch.
+
+        label: string label for the new Cdf
+
+        Returns: Cdf
+        """
+        if label is None:
+            label = self.label
+
+        xs = np.concatenate(self.compactors)
+        if len(xs) == 0:
+            return Cdf(label=label)
+
+        weights = [
+            np.full(len(items), 2.0**h)
+            for h, items in enumerate(self.compactors)
+        ]
+        weights = np.concatenate(weights)
+        pmf = MakePmfFromArrays(xs, weights, array=True)
+        return Cdf(pmf, label=label)
+
+    @property
+    def xs(self):
+        """Sorted array of the distinct values in the sketch."""
+        return self._Cdf().xs
+
+    @property
+    def ps(self):
+        """Array of the corresponding cumulative probabilities."""
+        return self._Cdf().ps
+
+    def Prob(self, x):
+        """Returns the approximate CDF(x).
+
+        x: number
+
+        Returns: float probability
+        """
+        return self._Cdf().Prob(x)
+
+    def Probs(self, xs):
+        """Gets approximate probabilities for a sequence of values.
+
+        xs: any sequence that can be converted to NumPy array
+
+        returns: NumPy array of cumulative probabilities
+        """
+        return self._Cdf().Probs(xs)
+
+    def Value(self, p):
+        """Returns the approximate InverseCDF(p).
+
+        p: number in the range [0, 1]
+
+        Returns: number value
+        """
+        return self._Cdf().Value(p)
+
+    def Values(self, ps=None):
+        """Returns the approximate InverseCDF(p) for each p in ps.
+
+        If ps is not provided, returns the values in the sketch.
+
+        ps: NumPy array of numbers in the range [0, 1]
+
+        Returns: NumPy array of values
+        """
+        return self._Cdf().Values(ps)
+
+    def Percentile(self, p):
+        """Returns the value that corresponds to percentile p.
+
+        p: number in the range [0, 100]
+
+        Returns: number value
+        """
+        return self._Cdf().Percentile(p)
+
+    def Percentiles(self, ps):
+        """Returns the values that correspond to percentiles ps.
+
+        ps: numbers in the range [0, 100]
+
+        Returns: array of values
+        """
+        return self._Cdf().Percentiles(ps)
+
+    def PercentileRank(self, x):
+        """Returns the approximate percentile rank of the value x.
+
+        x: number
+
+        returns: percentile rank in the range 0 to 100
+        """
+        return self._Cdf().PercentileRank(x)
+
+    def Random(self):
+        """Chooses a random value from this distribution."""
+        return self._Cdf().Random()
+
+    def Sample(self, n):
+        """Generates a random sample from this distribution.
+
+        n: int length of the sample
+        returns: NumPy array
+        """
+        return self._Cdf().Sample(n)
+
+    def Mean(self):
+        """Computes the approximate mean.
+
+        Returns: float mean
+        """
+        return self._Cdf().Mean()
+
+    def CredibleInterval(self, percentage=90):
+        """Computes the central credible interval.
+
+        percentage: float between 0 and 100
+
+        Returns: sequence of two floats, low and high
+        """
+        return self._Cdf().CredibleInterval(percentage)
+
+    def Render(self, **options):
+        """Generates a sequence of points suitable for plotting.
+
+        Returns: tuple of (xs, ps)
+        """
+        return self._Cdf().Render(**options)
+
+
 def MakeCdfFromItems(items, label=None):
     """Makes a cdf from an unsorted sequence of (value, frequency) pairs.
 
@@ -1400,7 +2921,13 @@ class UnimplementedMethodException(Exception):
 
 
 class Suite(Pmf):
-    """Represents a suite of hypotheses and their probabilities."""
+    """Represents a suite of hypotheses and their probabilities.
+
+    Subclasses provide either Likelihood, which evaluates one hypothesis
+    at a time, or the vectorized versions, Likelihoods or LogLikelihoods,
+    which evaluate all hypotheses in one call.  With the vectorized
+    versions, Update and UpdateSet work on arrays in log space.
+    """
 
     def Update(self, data):
         """Updates each hypothesis based on the data.
@@ -1409,6 +2936,9 @@ class Suite(Pmf):
 
         returns: the normalizing constant
         """
+        if self._HasArrayLikelihood():
+            return self._ArrayUpdateSet([data])
+
         for hypo in self.Values():
             like = self.Likelihood(data, hypo)
             self.Mult(hypo, like)
@@ -1425,6 +2955,10 @@ class Suite(Pmf):
         Args:
             data: any representation of the data
         """
+        if self._Overrides("LogLikelihoods"):
+            self.LogUpdateSet([data])
+            return
+
         for hypo in self.Values():
             like = self.LogLikelihood(data, hypo)
             self.Incr(hypo, like)
@@ -1442,6 +2976,9 @@ class Suite(Pmf):
 
         returns: the normalizing constant
         """
+        if self._HasArrayLikelihood():
+            return self._ArrayUpdateSet(dataset)
+
         for data in dataset:
             for hypo in self.Values():
                 like = self.Likelihood(data, hypo)
@@ -1458,9 +2995,77 @@ class Suite(Pmf):
 
         returns: None
         """
+        if self._Overrides("LogLikelihoods"):
+            keys, hypos, log_ps = self._HypoArrays()
+            log_ps = log_ps + self.LogLikelihoods(dataset, hypos)
+            self._SetHypoArrays(keys, log_ps)
+            return
+
         for data in dataset:
             self.LogUpdate(data)
 
+    def _ArrayUpdateSet(self, dataset):
+        """Updates all hypotheses at once using array likelihoods.
+
+        Works in log space, so long datasets don't underflow, and
+        normalizes at the end.
+
+        dataset: a sequence of data
+
+        returns: the normalizing constant
+        """
+        keys, hypos, ps = self._HypoArrays()
+        with np.errstate(divide="ignore"):
+            log_ps = np.log(ps)
+            if self._Overrides("LogLikelihoods"):
+                log_ps += self.LogLikelihoods(dataset, hypos)
+            else:
+                for data in dataset:
+                    log_ps += np.log(self.Likelihoods(data, hypos))
+
+        shift = log_ps.max()
+        if not np.isfinite(shift):
+            raise ValueError("Normalize: total probability is zero.")
+
+        ps = np.exp(log_ps - shift)
+        total = ps.sum()
+        self._SetHypoArrays(keys, ps / total)
+        return total * np.exp(shift)
+
+    def _HypoArrays(self):
+        """Gets the hypotheses and their probabilities as arrays.
+
+        returns: tuple of (list of hypotheses, NumPy array of hypotheses,
+                 NumPy array of probabilities)
+        """
+        if self.IsArray():
+            return None, self.d.xs, self.d.ps.astype(float)
+
+        keys = list(self.d.keys())
+        ps = np.asarray(list(self.d.values()), dtype=float)
+        return keys, np.asarray(keys), ps
+
+    def _SetHypoArrays(self, keys, ps):
+        """Replaces the probabilities of the hypotheses.
+
+        keys: list of hypotheses from _HypoArrays
+        ps: NumPy array of probabilities
+        """
+        if self.IsArray():
+            self.d.ps = ps
+        else:
+            self.d = dict(zip(keys, ps.tolist()))
+        self._Invalidate()
+
+    def _Overrides(self, name):
+        """Checks whether a subclass overrides the given method."""
+        return getattr(type(self), name) is not getattr(Suite, name)
+
+    def _HasArrayLikelihood(self):
+        """Checks whether a subclass provides vectorized likelihoods."""
+        names = ["Likelihoods", "LogLikelihoods"]
+        return any(self._Overrides(name) for name in names)
+
     def Likelihood(self, data, hypo):
         """Computes the likelihood of the data under the hypothesis.
 
@@ -1472,8 +3077,28 @@ class Suite(Pmf):
     def LogLikelihood(self, data, hypo):
         """Computes the log likelihood of the data under the hypothesis.
 
-        hypo: some representation of the hypothesis
-        data: some representation of the data
+        hypo: some representation of the hypothesis
+        data: some representation of the data
+        """
+        raise UnimplementedMethodException()
+
+    def Likelihoods(self, data, hypos):
+        """Computes the likelihood of the data under all hypotheses.
+
+        hypos: NumPy array of hypotheses
+        data: some representation of the data
+
+        returns: NumPy array of likelihoods, one per hypothesis
+        """
+        raise UnimplementedMethodException()
+
+    def LogLikelihoods(self, dataset, hypos):
+        """Computes the log likelihood of a dataset under all hypotheses.
+
+        hypos: NumPy array of hypotheses
+        dataset: a sequence of data
+
+        returns: NumPy array of total log likelihoods, one per hypothesis
         """
         raise UnimplementedMethodException()
 
@@ -1735,6 +3360,9 @@ def CredibleInterval(pmf, percentage=90):
     Returns:
         sequence of two floats, low and high
     """
+    if isinstance(pmf, Pmf):
+        return pmf.CredibleInterval(percentage)
+
     cdf = pmf.MakeCdf()
     prob = (1 - percentage / 100) / 2
     interval = cdf.Value(prob), cdf.Value(1 - prob)
@@ -1751,16 +3379,11 @@ def PmfProbLess(pmf1, pmf2):
     Returns:
         float probability
     """
-    total = 0
-    for v1, p1 in pmf1.Items():
-        for v2, p2 in pmf2.Items():
-            if v1 < v2:
-                total += p1 * p2
-    return total
+    return _ComparePmfs(pmf1, [pmf2], "less")[0].item()
 
 
 def PmfProbGreater(pmf1, pmf2):
-    """Probability that a value from pmf1 is less than a value from pmf2.
+    """Probability that a value from pmf1 is greater than a value from pmf2.
 
     Args:
         pmf1: Pmf object
@@ -1769,12 +3392,7 @@ def PmfProbGreater(pmf1, pmf2):
     Returns:
         float probability
     """
-    total = 0
-    for v1, p1 in pmf1.Items():
-        for v2, p2 in pmf2.Items():
-            if v1 > v2:
-                total += p1 * p2
-    return total
+    return _ComparePmfs(pmf1, [pmf2], "greater")[0].item()
 
 
 def PmfProbEqual(pmf1, pmf2):
@@ -1787,10 +3405,109 @@ def PmfProbEqual(pmf1, pmf2):
     Returns:
         float probability
     """
+    return _ComparePmfs(pmf1, [pmf2], "equal")[0].item()
+
+
+def PmfProbLessArray(pmf1, pmfs):
+    """Probability that a value from pmf1 is less than a value from each pmf.
+
+    pmf1: Pmf object
+    pmfs: sequence of Pmf objects
+
+    returns: NumPy array of probabilities, one for each element of pmfs
+    """
+    return _ComparePmfs(pmf1, pmfs, "less")
+
+
+def PmfProbGreaterArray(pmf1, pmfs):
+    """Probability that a value from pmf1 exceeds a value from each pmf.
+
+    pmf1: Pmf object
+    pmfs: sequence of Pmf objects
+
+    returns: NumPy array of probabilities, one for each element of pmfs
+    """
+    return _ComparePmfs(pmf1, pmfs, "greater")
+
+
+def PmfProbEqualArray(pmf1, pmfs):
+    """Probability that a value from pmf1 equals a value from each pmf.
+
+    pmf1: Pmf object
+    pmfs: sequence of Pmf objects
+
+    returns: NumPy array of probabilities, one for each element of pmfs
+    """
+    return _ComparePmfs(pmf1, pmfs, "equal")
+
+
+def _ComparePmfs(pmf1, pmfs, relation):
+    """Computes P(V1 relation V2) for V1 from pmf1 and V2 from each pmf.
+
+    Sorts pmf1 once and computes its cumulative sums; then each value
+    from the other Pmfs is located with a binary search, so the total
+    cost is O((n+m) log n) rather than O(n*m).
+
+    pmf1: Pmf object
+    pmfs: sequence of Pmf objects
+    relation: string 'less', 'greater' or 'equal'
+
+    returns: NumPy array of probabilities
+    """
+    ops = dict(less=lt, greater=gt, equal=eq)
+    op = ops[relation]
+    res = np.zeros(len(pmfs))
+
+    # Pmfs with non-numeric values are compared the slow way
+    arrays1 = _NumericArrays(pmf1)
+    arrays = [_NumericArrays(pmf2) for pmf2 in pmfs]
+    if arrays1 is None:
+        arrays = [None] * len(pmfs)
+
+    for i, pmf2 in enumerate(pmfs):
+        if arrays[i] is None:
+            res[i] = _ComparePmfsLoop(pmf1, pmf2, op)
+
+    numeric = [i for i, a in enumerate(arrays) if a is not None]
+    if len(numeric) == 0:
+        return res
+
+    xs1, ps1 = arrays1
+    order = np.argsort(xs1, kind="stable")
+    xs1 = xs1[order]
+    cum1 = np.concatenate(([0], np.cumsum(ps1[order])))
+
+    # put the values from all of the other Pmfs in one array
+    xs2 = np.concatenate([arrays[i][0] for i in numeric])
+    ps2 = np.concatenate([arrays[i][1] for i in numeric])
+    groups = np.repeat(numeric, [len(arrays[i][0]) for i in numeric])
+
+    # left is P(V1 < x2); right is P(V1 <= x2)
+    left = cum1[np.searchsorted(xs1, xs2, side="left")]
+    right = cum1[np.searchsorted(xs1, xs2, side="right")]
+    if relation == "less":
+        probs = left
+    elif relation == "greater":
+        probs = cum1[-1] - right
+    else:
+        probs = right - left
+
+    res += np.bincount(groups, weights=ps2 * probs, minlength=len(pmfs))
+    return res
+
+
+def _ComparePmfsLoop(pmf1, pmf2, op):
+    """Computes P(op(V1, V2)) by enumerating all pairs of values.
+
+    pmf1, pmf2: Pmf objects
+    op: comparison function like operator.lt
+
+    returns: float probability
+    """
     total = 0
     for v1, p1 in pmf1.Items():
         for v2, p2 in pmf2.Items():
-            if v1 == v2:
+            if op(v1, v2):
                 total += p1 * p2
     return total
 
@@ -1814,7 +3531,9 @@ def SampleSum(dists, n):
 
     returns: new Pmf of sums
     """
-    pmf = Pmf(RandomSum(dists) for i in range(n))
+    # start from zeros, so the sum of no distributions is 0, as before
+    total = np.zeros(n, dtype=int)
+    pmf = Pmf(sum((dist.Sample(n) for dist in dists), total))
     return pmf
 
 
@@ -2488,6 +4207,77 @@ def MeanVar(xs, ddof=0):
     return mean, s2
 
 
+class RunningMeanVar(object):
+    """Accumulates the mean and variance of a stream of values.
+
+    Keeps the count, mean and sum of squared deviations, and combines
+    chunks with the pairwise update of Chan et al., which is numerically
+    stable and lets accumulators from separate chunks or processes be
+    merged.
+    """
+
+    def __init__(self, xs=None):
+        """Initializes.
+
+        xs: sequence of values to add, or None
+        """
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        if xs is not None:
+            self.Update(xs)
+
+    def _Combine(self, n, mean, m2):
+        """Adds the summary of a group of n values."""
+        if n == 0:
+            return
+        total = self.n + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta**2 * self.n * n / total
+        self.n = total
+
+    def Update(self, xs):
+        """Adds a chunk of values; NaNs are ignored.
+
+        xs: sequence of numbers
+        """
+        xs = np.asarray(xs, dtype=float)
+        xs = xs[~np.isnan(xs)]
+        if len(xs):
+            mean = xs.mean()
+            self._Combine(len(xs), mean, np.sum((xs - mean) ** 2))
+
+    def Merge(self, other):
+        """Adds the values summarized by another RunningMeanVar.
+
+        other: RunningMeanVar
+        """
+        self._Combine(other.n, other.mean, other.m2)
+
+    def Mean(self):
+        """Returns the mean, or NaN if there are no values."""
+        return self.mean if self.n else np.nan
+
+    def Var(self, ddof=0):
+        """Returns the variance.
+
+        ddof: delta degrees of freedom
+        """
+        if self.n - ddof <= 0:
+            return np.nan
+        return self.m2 / (self.n - ddof)
+
+    def MeanVar(self, ddof=0):
+        """Returns the mean and variance.
+
+        ddof: delta degrees of freedom
+
+        returns: pair of float, mean and var
+        """
+        return self.Mean(), self.Var(ddof)
+
+
 def Trim(t, p=0.01):
     """Trims the largest and smallest elements of t.
 
@@ -2734,144 +4524,679 @@ def CorrelatedGenerator(rho):
 def CorrelatedNormalGenerator(mu, sigma, rho):
     """Generates normal variates with serial correlation.
 
-    mu: mean of variate
-    sigma: standard deviation of variate
-    rho: target coefficient of correlation
+    mu: mean of variate
+    sigma: standard deviation of variate
+    rho: target coefficient of correlation
+
+    Returns: iterable
+    """
+    for x in CorrelatedGenerator(rho):
+        yield x * sigma + mu
+
+
+def RawMoment(xs, k):
+    """Computes the kth raw moment of xs."""
+    return sum(x**k for x in xs) / len(xs)
+
+
+def CentralMoment(xs, k):
+    """Computes the kth central moment of xs."""
+    mean = RawMoment(xs, 1)
+    return sum((x - mean) ** k for x in xs) / len(xs)
+
+
+def StandardizedMoment(xs, k):
+    """Computes the kth standardized moment of xs."""
+    var = CentralMoment(xs, 2)
+    std = math.sqrt(var)
+    return CentralMoment(xs, k) / std**k
+
+
+def Skewness(xs):
+    """Computes skewness."""
+    return StandardizedMoment(xs, 3)
+
+
+def Median(xs):
+    """Computes the median (50th percentile) of a sequence.
+
+    xs: sequence or anything else that can initialize a Cdf
+
+    returns: float
+    """
+    cdf = Cdf(xs)
+    return cdf.Value(0.5)
+
+
+def IQR(xs):
+    """Computes the interquartile of a sequence.
+
+    xs: sequence or anything else that can initialize a Cdf
+
+    returns: pair of floats
+    """
+    cdf = Cdf(xs)
+    return cdf.Value(0.25), cdf.Value(0.75)
+
+
+def PearsonMedianSkewness(xs):
+    """Computes the Pearson median skewness."""
+    median = Median(xs)
+    mean = RawMoment(xs, 1)
+    var = CentralMoment(xs, 2)
+    std = math.sqrt(var)
+    gp = 3 * (mean - median) / std
+    return gp
+
+
+class FixedWidthVariables(object):
+    """Represents a set of variables in a fixed width file."""
+
+    def __init__(self, variables, index_base=0):
+        """Initializes.
+
+        variables: DataFrame
+        index_base: are the indices 0 or 1 based?
+
+        Attributes:
+        colspecs: list of (start, end) index tuples
+        names: list of string variable names
+        """
+        self.variables = variables
+        self.index_base = index_base
+
+        # note: by default, subtract 1 from colspecs
+        self.colspecs = variables[["start", "end"]] - index_base
+
+        # convert colspecs to a list of pair of int
+        self.colspecs = self.colspecs.astype(int).values.tolist()
+        self.names = variables["name"]
+
+    def ReadFixedWidth(self, filename, **options):
+        """Reads a fixed width ASCII file.
+
+        filename: string filename
+
+        returns: DataFrame
+        """
+        df = pandas.read_fwf(
+            filename, colspecs=self.colspecs, names=self.names, **options
+        )
+        return df
+
+    def ReadFixedWidthFast(
+        self, filename, usecols=None, compression="infer", nrows=None
+    ):
+        """Reads selected columns of a fixed width ASCII file.
+
+        Loads the file into a NumPy byte matrix with one row per line and
+        parses only the byte ranges of the requested columns, using the
+        dtypes declared in the dictionary (see ReadStataDct).  Integer
+        columns with blank fields are converted to float, with NaN for
+        the blanks.
+
+        filename: string filename
+        usecols: sequence of variable names; default is all variables
+        compression: 'gzip', 'bz2', None, or 'infer' to use the extension
+        nrows: number of lines to read; default is all
+
+        returns: DataFrame
+        """
+        variables = self.variables.reset_index(drop=True)
+        if usecols is not None:
+            missing = set(usecols) - set(variables.name)
+            if missing:
+                raise ValueError("Unknown variables: %s" % sorted(missing))
+            variables = variables[variables.name.isin(usecols)]
+
+        matrix = _ReadByteMatrix(filename, compression, nrows)
+
+        columns = {}
+        for _, var in variables.iterrows():
+            start, end = self._ByteRange(var)
+            field = matrix[:, start:end]
+            dtype = var.get("dtype")
+            if dtype is None:
+                # variables that don't come from ReadStataDct
+                dtype = {int: np.int64, float: np.float64}.get(var.get("type"))
+            columns[var["name"]] = _ParseField(field, dtype)
+        return pandas.DataFrame(columns)
+
+    def _ByteRange(self, var):
+        """Gets the 0-based byte range of a variable.
+
+        The last variable has end -1 in colspecs; use the width from its
+        format string instead, if there is one.
+
+        var: row of self.variables
+
+        returns: pair of ints (start, end)
+        """
+        start = int(var["start"]) - self.index_base
+        end = int(var["end"]) - self.index_base
+        if var["end"] == -1:
+            width = var.get("width", np.nan)
+            end = start + int(width) if width == width else None
+        return start, end
+
+
+# NumPy dtypes that hold the Stata storage types; float columns are
+# float64 because the text can have more digits than float32 holds
+STATA_DTYPES = dict(
+    byte=np.int8,
+    int=np.int16,
+    long=np.int32,
+    float=np.float64,
+    double=np.float64,
+    numeric=np.float64,
+)
+
+
+def _ReadByteMatrix(filename, compression="infer", nrows=None):
+    """Reads the lines of a text file into a matrix of bytes.
+
+    Lines shorter than the longest line are padded with spaces.
+
+    filename: string filename
+    compression: 'gzip', 'bz2', None, or 'infer' to use the extension
+    nrows: number of lines to read; default is all
+
+    returns: 2-D NumPy array of uint8, one row per line
+    """
+    if compression == "infer":
+        compression = None
+        if filename.endswith(".gz"):
+            compression = "gzip"
+        elif filename.endswith(".bz2"):
+            compression = "bz2"
+
+    if compression == "gzip":
+        import gzip
+
+        opener = gzip.open
+    elif compression == "bz2":
+        import bz2
+
+        opener = bz2.open
+    elif compression is None:
+        opener = open
+    else:
+        raise ValueError("Unsupported compression: %s" % compression)
+
+    with opener(filename, "rb") as f:
+        if nrows is None:
+            data = f.read()
+        else:
+            data = b"".join(itertools.islice(f, nrows))
+
+    # terminate the last line, so every line ends with a newline
+    if data and not data.endswith(b"\n"):
+        data += b"\n"
+
+    buf = np.frombuffer(data, dtype=np.uint8)
+    ends = np.flatnonzero(buf == ord("\n"))
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    lengths = ends - starts
+
+    # strip carriage returns from Windows line endings
+    if len(buf) and np.all(buf[ends[lengths > 0] - 1] == ord("\r")):
+        lengths = lengths - (lengths > 0)
+
+    n = len(starts)
+    width = lengths.max() if n else 0
+    if n and np.all(lengths == width) and np.all(np.diff(starts) == width + 1):
+        # every line has the same length, so reshaping is enough
+        return buf[: n * (width + 1)].reshape(n, width + 1)[:, :width]
+
+    matrix = np.full((n, width), ord(" "), dtype=np.uint8)
+    rows = np.repeat(np.arange(n), lengths)
+    offsets = np.cumsum(lengths) - lengths
+    cols = np.arange(len(rows)) - np.repeat(offsets, lengths)
+    matrix[rows, cols] = buf[np.repeat(starts, lengths) + cols]
+    return matrix
+
+
+def _ParseField(field, dtype=None):
+    """Parses a fixed width field from a matrix of bytes.
+
+    field: 2-D NumPy array of uint8, one row per line
+    dtype: NumPy dtype to convert to; integer dtypes become float if
+           there are blanks; None or object means string
+
+    returns: NumPy array
+    """
+    n, width = field.shape
+    blank = np.all(field == ord(" "), axis=1)
+
+    if dtype is None or np.dtype(dtype) == object:
+        strings = np.ascontiguousarray(field).view("S%d" % width).ravel()
+        values = np.char.strip(strings.astype("U%d" % width)).astype(object)
+        values[blank] = np.nan
+        return values
+
+    dtype = np.dtype(dtype)
+    digits = (field >= ord("0")) & (field <= ord("9"))
+    minus = field == ord("-")
+    simple = np.all(digits | minus | (field == ord(" ")))
+
+    if dtype.kind in "iu" and simple:
+        # compute integers from the digits: each digit is multiplied by
+        # 10 ** (number of digits to its right)
+        powers = np.cumsum(digits[:, ::-1], axis=1)[:, ::-1] - 1
+        scales = 10 ** np.maximum(powers, 0)
+        terms = (field.astype(np.int64) - ord("0")) * scales
+        values = np.where(digits, terms, 0).sum(axis=1)
+        values[minus.any(axis=1)] *= -1
+
+        info = np.iinfo(dtype)
+        if n and (values.min() < info.min or values.max() > info.max):
+            dtype = np.dtype(np.int64)
+
+        if not blank.any():
+            return values.astype(dtype)
+        float_type = np.float32 if dtype.itemsize <= 2 else np.float64
+        values = values.astype(float_type)
+        values[blank] = np.nan
+        return values
+
+    strings = np.ascontiguousarray(field).view("S%d" % width).ravel().copy()
+    strings[blank] = b"nan"
+    values = strings.astype(np.float64)
+    if dtype.kind == "f":
+        return values.astype(dtype)
+    return values
+
+
+def ReadStataDct(dct_file, **options):
+    """Reads a Stata dictionary file.
+
+    The variables DataFrame has the declared type as a Python type
+    (type), a NumPy dtype that holds it (dtype, see STATA_DTYPES) and the
+    field width from the format string (width).
+
+    dct_file: string filename
+    options: dict of options passed to open()
+
+    returns: FixedWidthVariables object
+    """
+    type_map = dict(
+        byte=int, int=int, long=int, float=float, double=float, numeric=float
+    )
+
+    var_info = []
+    with open(dct_file, **options) as f:
+        for line in f:
+            match = re.search(r"_column\(([^)]*)\)", line)
+            if not match:
+                continue
+            start = int(match.group(1))
+            t = line.split()
+            vtype, name, fstring = t[1:4]
+            name = name.lower()
+            if vtype.startswith("str"):
+                vtype, dtype = str, object
+            else:
+                vtype, dtype = type_map[vtype], STATA_DTYPES[vtype]
+            match = re.match(r"%(\d+)", fstring)
+            width = int(match.group(1)) if match else np.nan
+            long_desc = " ".join(t[4:]).strip('"')
+            var_info.append(
+                (start, vtype, name, fstring, long_desc, dtype, width)
+            )
+
+    columns = ["start", "type", "name", "fstring", "desc", "dtype", "width"]
+    variables = pandas.DataFrame(var_info, columns=columns)
+
+    # fill in the end column by shifting the start column
+    variables["end"] = variables.start.shift(-1)
+    variables.loc[len(variables) - 1, "end"] = -1
+
+    dct = FixedWidthVariables(variables, index_base=1)
+    return dct
+
+
+def _HashFile(filename, block_size=2**20):
+    """Computes the SHA-256 digest of a file's contents.
+
+    filename: string
+
+    returns: string hex digest
+    """
+    h = hashlib.sha256()
+    with open(filename, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _FunctionSource(func):
+    """Gets the source code of a function, or its bytecode if the
+    source is not available.
+
+    func: function
+
+    returns: string
+    """
+    try:
+        return inspect.getsource(func)
+    except (OSError, TypeError):
+        return repr(func.__code__.co_code)
+
+
+# name of the file that describes the columns in a column store
+COLUMN_STORE_META = "meta.json"
+
+
+def SaveColumns(df, dirname, **meta):
+    """Saves a DataFrame as a column store: a directory of .npy files.
+
+    Each column goes in its own .npy file, so ColumnStore can map the
+    numeric columns into memory; processes that open the same store
+    share one copy in the page cache.  Columns of Python objects, like
+    strings, are pickled and have to be loaded into memory.
+
+    df: DataFrame
+    dirname: string directory name; created if necessary
+    meta: additional items to store in the description
+    """
+    os.makedirs(dirname, exist_ok=True)
+
+    columns = [(name, df[name].values) for name in df.columns]
+    if not df.index.equals(pandas.RangeIndex(len(df))):
+        columns.append(("__index__", df.index.values))
+
+    files, pickled = [], []
+    for i, (name, values) in enumerate(columns):
+        values = np.asarray(values)
+        is_object = values.dtype.kind == "O"
+        np.save(
+            os.path.join(dirname, "%d.npy" % i), values, allow_pickle=is_object
+        )
+        files.append(name)
+        pickled.append(is_object)
+
+    meta.update(
+        columns=files, names=list(df.columns), pickled=pickled, length=len(df)
+    )
+    with open(os.path.join(dirname, COLUMN_STORE_META), "w") as f:
+        json.dump(meta, f)
+
 
-    Returns: iterable
+class ColumnStore(object):
+    """A read-only, DataFrame-like view of a column store.
+
+    Columns are loaded when they are first used; numeric columns are
+    memory-mapped rather than read.  Use store.name or store['name'] to
+    get a column as a NumPy array, ToDataFrame to wrap the arrays in a
+    DataFrame without copying them, and MakeHist, MakePmf or MakeCdf to
+    summarize a column.
     """
-    for x in CorrelatedGenerator(rho):
-        yield x * sigma + mu
 
+    def __init__(self, dirname, mmap_mode="r"):
+        """Opens a column store made by SaveColumns.
 
-def RawMoment(xs, k):
-    """Computes the kth raw moment of xs."""
-    return sum(x**k for x in xs) / len(xs)
+        dirname: string directory name
+        mmap_mode: 'r' for read-only arrays, 'c' for copy-on-write
+        """
+        with open(os.path.join(dirname, COLUMN_STORE_META)) as f:
+            self.meta = json.load(f)
+        self.dirname = dirname
+        self.mmap_mode = mmap_mode
+        self.columns = self.meta["names"]
+        self._arrays = {}
 
+    def __len__(self):
+        return self.meta["length"]
 
-def CentralMoment(xs, k):
-    """Computes the kth central moment of xs."""
-    mean = RawMoment(xs, 1)
-    return sum((x - mean) ** k for x in xs) / len(xs)
+    def __contains__(self, name):
+        return name in self.columns
 
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.Column(key)
+        return self.ToDataFrame(key)
 
-def StandardizedMoment(xs, k):
-    """Computes the kth standardized moment of xs."""
-    var = CentralMoment(xs, 2)
-    std = math.sqrt(var)
-    return CentralMoment(xs, k) / std**k
+    def __getattr__(self, name):
+        # look in __dict__ so a missing attribute can't recurse
+        columns = self.__dict__.get("columns", ())
+        if name.startswith("_") or name not in columns:
+            raise AttributeError(name)
+        return self.Column(name)
 
+    def __repr__(self):
+        return "ColumnStore(%r)" % self.dirname
 
-def Skewness(xs):
-    """Computes skewness."""
-    return StandardizedMoment(xs, 3)
+    def Column(self, name):
+        """Gets a column as a NumPy array, memory-mapped if possible.
 
+        name: column name
 
-def Median(xs):
-    """Computes the median (50th percentile) of a sequence.
+        returns: NumPy array
+        """
+        if name not in self._arrays:
+            try:
+                i = self.meta["columns"].index(name)
+            except ValueError:
+                raise KeyError(name)
+            filename = os.path.join(self.dirname, "%d.npy" % i)
+            if self.meta["pickled"][i]:
+                array = np.load(filename, allow_pickle=True)
+            else:
+                array = np.load(filename, mmap_mode=self.mmap_mode)
+            self._arrays[name] = array
+        return self._arrays[name]
 
-    xs: sequence or anything else that can initialize a Cdf
+    @property
+    def index(self):
+        """The index of the saved DataFrame."""
+        if "__index__" in self.meta["columns"]:
+            return pandas.Index(self.Column("__index__"))
+        return pandas.RangeIndex(len(self))
 
-    returns: float
-    """
-    cdf = Cdf(xs)
-    return cdf.Value(0.5)
+    def ToDataFrame(self, columns=None):
+        """Makes a DataFrame that uses the mapped arrays without copying.
 
+        columns: sequence of column names; default is all
 
-def IQR(xs):
-    """Computes the interquartile of a sequence.
+        returns: DataFrame
+        """
+        if columns is None:
+            columns = self.columns
+        data = {name: self.Column(name) for name in columns}
+        return pandas.DataFrame(
+            data, index=self.index, columns=list(columns), copy=False
+        )
 
-    xs: sequence or anything else that can initialize a Cdf
+    def _Series(self, name):
+        return pandas.Series(self.Column(name), copy=False)
 
-    returns: pair of floats
-    """
-    cdf = Cdf(xs)
-    return cdf.Value(0.25), cdf.Value(0.75)
+    def MakeHist(self, name, label=None):
+        """Makes an array-backed Hist of a column; NaNs are dropped.
 
+        name: column name
+        label: string label; default is the column name
 
-def PearsonMedianSkewness(xs):
-    """Computes the Pearson median skewness."""
-    median = Median(xs)
-    mean = RawMoment(xs, 1)
-    var = CentralMoment(xs, 2)
-    std = math.sqrt(var)
-    gp = 3 * (mean - median) / std
-    return gp
+        returns: Hist
+        """
+        label = label if label is not None else name
+        return Hist(self._Series(name), label=label, array=True)
 
+    def MakePmf(self, name, label=None):
+        """Makes an array-backed Pmf of a column; NaNs are dropped.
 
-class FixedWidthVariables(object):
-    """Represents a set of variables in a fixed width file."""
+        name: column name
+        label: string label; default is the column name
 
-    def __init__(self, variables, index_base=0):
-        """Initializes.
+        returns: Pmf
+        """
+        label = label if label is not None else name
+        return Pmf(self._Series(name), label=label, array=True)
 
-        variables: DataFrame
-        index_base: are the indices 0 or 1 based?
+    def MakeCdf(self, name, label=None):
+        """Makes a Cdf of a column; NaNs are dropped.
 
-        Attributes:
-        colspecs: list of (start, end) index tuples
-        names: list of string variable names
+        name: column name
+        label: string label; default is the column name
+
+        returns: Cdf
         """
-        self.variables = variables
+        return Cdf(self.MakeHist(name, label))
 
-        # note: by default, subtract 1 from colspecs
-        self.colspecs = variables[["start", "end"]] - index_base
 
-        # convert colspecs to a list of pair of int
-        self.colspecs = self.colspecs.astype(int).values.tolist()
-        self.names = variables["name"]
+class FrameCache(object):
+    """A content-addressed cache of DataFrames in a directory.
 
-    def ReadFixedWidth(self, filename, **options):
-        """Reads a fixed width ASCII file.
+    Each entry is a directory named by a key, which is a hash of the
+    contents of the input files, the source code of the function that
+    makes the DataFrame (and the functions it depends on), its
+    arguments, and an optional version string.  Changing the data or
+    the cleaning code changes the key, so stale entries are never used.
 
-        filename: string filename
+    An entry is a column store (see SaveColumns), so numeric columns load
+    memory-mapped (copy-on-write, so the DataFrame can be modified
+    without changing the cache).  When the directory grows past
+    max_bytes, the least recently used entries are removed.
+    """
+
+    def __init__(self, cache_dir, max_bytes=2**30):
+        """Initializes.
+
+        cache_dir: string directory name; created if necessary
+        max_bytes: int size limit for the directory
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def Key(
+        self, func, files=(), args=(), kwargs=None, depends=(), version=None
+    ):
+        """Computes the key for a call.
+
+        func: function that returns a DataFrame
+        files: sequence of input file names, hashed by contents
+        args: positional arguments for func
+        kwargs: dict of keyword arguments for func
+        depends: sequence of other functions whose code matters
+        version: string, change it to invalidate old entries
+
+        returns: string hex digest
+        """
+        h = hashlib.sha256()
+        parts = [
+            func.__module__,
+            func.__qualname__,
+            version,
+            repr(args),
+            repr(sorted((kwargs or {}).items())),
+        ]
+        parts += [_FunctionSource(f) for f in [func] + list(depends)]
+        parts += [_HashFile(filename) for filename in files]
+        for part in parts:
+            h.update(str(part).encode("utf-8"))
+            h.update(b"\0")
+        return h.hexdigest()
+
+    def _Path(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def Read(
+        self, func, files=(), args=(), kwargs=None, depends=(), version=None
+    ):
+        """Gets the DataFrame func(*args, **kwargs), from the cache if we can.
+
+        Parameters are the same as for Key.
 
         returns: DataFrame
         """
-        df = pandas.read_fwf(
-            filename, colspecs=self.colspecs, names=self.names, **options
-        )
+        kwargs = kwargs or {}
+        key = self.Key(func, files, args, kwargs, depends, version)
+        df = self.Get(key)
+        if df is None:
+            df = func(*args, **kwargs)
+            self.Put(key, df, func.__qualname__)
         return df
 
+    def Get(self, key):
+        """Loads the DataFrame with the given key.
 
-def ReadStataDct(dct_file, **options):
-    """Reads a Stata dictionary file.
+        key: string
 
-    dct_file: string filename
-    options: dict of options passed to open()
+        returns: DataFrame, or None if there is no such entry
+        """
+        path = self._Path(key)
+        meta_file = os.path.join(path, COLUMN_STORE_META)
+        if not os.path.exists(meta_file):
+            return None
 
-    returns: FixedWidthVariables object
-    """
-    type_map = dict(
-        byte=int, int=int, long=int, float=float, double=float, numeric=float
-    )
+        # mark the entry as recently used
+        os.utime(meta_file)
+        return ColumnStore(path, mmap_mode="c").ToDataFrame()
 
-    var_info = []
-    with open(dct_file, **options) as f:
-        for line in f:
-            match = re.search(r"_column\(([^)]*)\)", line)
-            if not match:
+    def Put(self, key, df, function=None):
+        """Stores a DataFrame.
+
+        key: string
+        df: DataFrame
+        function: string name of the function that made it
+        """
+        path = self._Path(key)
+        tmp_path = tempfile.mkdtemp(dir=self.cache_dir, prefix=".tmp")
+        SaveColumns(df, tmp_path, function=function)
+
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
+        self.Evict(keep=key)
+
+    def Entries(self):
+        """Describes the entries in the cache.
+
+        returns: list of (key, size in bytes, last used time, function name)
+        """
+        entries = []
+        for key in os.listdir(self.cache_dir):
+            path = self._Path(key)
+            meta_file = os.path.join(path, COLUMN_STORE_META)
+            if key.startswith(".") or not os.path.exists(meta_file):
                 continue
-            start = int(match.group(1))
-            t = line.split()
-            vtype, name, fstring = t[1:4]
-            name = name.lower()
-            if vtype.startswith("str"):
-                vtype = str
-            else:
-                vtype = type_map[vtype]
-            long_desc = " ".join(t[4:]).strip('"')
-            var_info.append((start, vtype, name, fstring, long_desc))
+            size = sum(
+                os.path.getsize(os.path.join(path, name))
+                for name in os.listdir(path)
+            )
+            with open(meta_file) as f:
+                function = json.load(f).get("function")
+            entries.append((key, size, os.path.getmtime(meta_file), function))
+        return entries
 
-    columns = ["start", "type", "name", "fstring", "desc"]
-    variables = pandas.DataFrame(var_info, columns=columns)
+    def Evict(self, keep=None):
+        """Removes least recently used entries until the cache fits.
 
-    # fill in the end column by shifting the start column
-    variables["end"] = variables.start.shift(-1)
-    variables.loc[len(variables) - 1, "end"] = -1
+        keep: key of an entry that should not be removed
+        """
+        entries = sorted(self.Entries(), key=itemgetter(2))
+        total = sum(size for _, size, _, _ in entries)
+        for key, size, _, _ in entries:
+            if total <= self.max_bytes:
+                break
+            if key != keep:
+                self.Remove(key)
+                total -= size
 
-    dct = FixedWidthVariables(variables, index_base=1)
-    return dct
+    def Remove(self, key):
+        """Removes the entry with the given key, if there is one.
+
+        key: string
+        """
+        shutil.rmtree(self._Path(key), ignore_errors=True)
+
+    def Invalidate(self, func=None):
+        """Removes the entries made by a function, or all entries.
+
+        func: function, or None to clear the whole cache
+        """
+        for key, _, _, function in self.Entries():
+            if func is None or function == func.__qualname__:
+                self.Remove(key)
 
 
 def Resample(xs, n=None):
@@ -2926,6 +5251,349 @@ def ResampleRowsWeighted(df, column="finalwgt"):
     return sample
 
 
+class Bootstrap(object):
+    """Draws bootstrap replicates of a DataFrame without copying it.
+
+    With method='resample', the replicates are blocks of row indices,
+    drawn from a seeded generator one chunk of iterations at a time, so
+    memory is bounded by max_bytes.  The other methods reweight the rows
+    instead of gathering them: 'poisson' gives each row a Poisson(1)
+    count and 'bayes' gives the rows Dirichlet weights (the Bayesian
+    bootstrap).  Each method starts again from the seed, so statistics
+    computed with the same Bootstrap use the same replicates.
+
+    Statistics are evaluated over only the columns they need.  The
+    reducers (Mean, Var, LeastSquares) are weighted sums, computed for a
+    block of replicates with one matrix product; Apply and Samples
+    gather rows for other statistics.
+    """
+
+    methods = ["resample", "poisson", "bayes"]
+
+    def __init__(
+        self,
+        df,
+        iters=1000,
+        weights=None,
+        seed=None,
+        max_bytes=2**26,
+        method="resample",
+    ):
+        """Initializes.
+
+        df: DataFrame
+        iters: number of replicates
+        weights: string column name of survey weights, or None.  When
+                 resampling, rows are drawn with probability proportional
+                 to the weights, like ResampleRowsWeighted; otherwise the
+                 replicate weights are multiplied by them.
+        seed: int seed, or None to draw one from np.random, so that
+              RandomSeed makes the results reproducible
+        max_bytes: approximate memory limit for one chunk of replicates
+        method: 'resample', 'poisson' or 'bayes'
+        """
+        if method not in self.methods:
+            raise ValueError("Bootstrap: unknown method %r" % (method,))
+        self.df = df
+        self.n = len(df)
+        self.iters = iters
+        self.max_bytes = max_bytes
+        self.method = method
+        if seed is None:
+            seed = np.random.randint(2**63, dtype=np.int64)
+        self.seed = seed
+
+        self.sampler = None
+        self.survey = None
+        if weights is not None:
+            if method == "resample":
+                self.sampler = AliasSampler(
+                    np.arange(self.n), df[weights].values
+                )
+            else:
+                self.survey = np.asarray(df[weights].values, dtype=float)
+
+    def ChunkSize(self, ncols=1):
+        """Number of replicates per chunk.
+
+        ncols: number of columns gathered for each replicate
+
+        returns: int
+        """
+        row_bytes = 8 * max(self.n, 1) * (ncols + 1)
+        return int(max(1, min(self.iters, self.max_bytes // row_bytes)))
+
+    def _Chunks(self, ncols):
+        """Generates (rng, k) pairs, one for each block of replicates."""
+        rng = np.random.default_rng(self.seed)
+        chunk_size = self.ChunkSize(ncols)
+        for start in range(0, self.iters, chunk_size):
+            yield rng, min(chunk_size, self.iters - start)
+
+    def Indices(self, ncols=1):
+        """Generates blocks of positional row indices.
+
+        Only for method='resample'.
+
+        ncols: number of columns the caller gathers, to size the chunks
+
+        returns: iterator of int arrays with shape (replicates, n)
+        """
+        if self.method != "resample":
+            raise ValueError(
+                "Bootstrap: %s replicates are weights, "
+                "not indices" % self.method
+            )
+        for rng, k in self._Chunks(ncols):
+            if self.sampler is None:
+                yield rng.integers(self.n, size=(k, self.n))
+            else:
+                indices = self.sampler.Indices(k * self.n, rng)
+                yield indices.reshape(k, self.n)
+
+    def Counts(self):
+        """Generates blocks of counts, how many times each row is drawn.
+
+        Only for method='resample'.
+
+        returns: iterator of int arrays with shape (replicates, n)
+        """
+        for indices in self.Indices():
+            k = len(indices)
+            offsets = indices + self.n * np.arange(k)[:, None]
+            counts = np.bincount(offsets.ravel(), minlength=k * self.n)
+            yield counts.reshape(k, self.n)
+
+    def Weights(self):
+        """Generates blocks of replicate weights.
+
+        For method='resample', the weights are the counts; otherwise they
+        are Poisson counts or Dirichlet weights (scaled to sum to n),
+        times the survey weights, if any.
+
+        returns: iterator of float arrays with shape (replicates, n)
+        """
+        if self.method == "resample":
+            for counts in self.Counts():
+                yield counts.astype(float)
+            return
+
+        for rng, k in self._Chunks(1):
+            if self.method == "poisson":
+                ws = rng.poisson(1.0, size=(k, self.n)).astype(float)
+            else:
+                ws = rng.standard_exponential(size=(k, self.n))
+                ws *= self.n / ws.sum(axis=1, keepdims=True)
+            if self.survey is not None:
+                ws *= self.survey
+            yield ws
+
+    def _Columns(self, columns):
+        """Gets columns as float arrays."""
+        return [
+            np.asarray(self.df[column].values, dtype=float)
+            for column in columns
+        ]
+
+    def Apply(self, func, columns):
+        """Evaluates a vectorized statistic for each replicate.
+
+        Only for method='resample'.
+
+        func: takes one (replicates x rows) array per column and returns
+              a sequence with one value per replicate
+        columns: sequence of column names
+
+        returns: NumPy array with one value per replicate
+        """
+        arrays = [np.asarray(self.df[column].values) for column in columns]
+        results = []
+        for indices in self.Indices(len(columns)):
+            results.append(np.asarray(func(*[a[indices] for a in arrays])))
+        return np.concatenate(results)
+
+    def Samples(self, columns):
+        """Generates resampled DataFrames with the given columns.
+
+        For statistics that are not vectorized; the other columns are
+        never copied.  Only for method='resample'.
+
+        columns: sequence of column names
+
+        returns: iterator of DataFrames
+        """
+        arrays = [self.df[column].values for column in columns]
+        for indices in self.Indices(len(columns)):
+            for row in indices:
+                data = dict(
+                    (column, a[row]) for column, a in zip(columns, arrays)
+                )
+                yield pandas.DataFrame(data, columns=columns)
+
+    def Mean(self, column):
+        """Computes the mean of a column for each replicate.
+
+        NaNs are skipped, like Series.mean.
+
+        column: string column name
+
+        returns: NumPy array
+        """
+        return self.MeanVar(column)[0]
+
+    def Var(self, column, ddof=0):
+        """Computes the variance of a column for each replicate.
+
+        column: string column name
+        ddof: delta degrees of freedom
+
+        returns: NumPy array
+        """
+        return self.MeanVar(column, ddof)[1]
+
+    def MeanVar(self, column, ddof=0):
+        """Computes the mean and variance of a column for each replicate.
+
+        NaNs are skipped.  The values are centered on the sample mean
+        first, which keeps the sums of squares accurate.
+
+        column: string column name
+        ddof: delta degrees of freedom
+
+        returns: pair of NumPy arrays
+        """
+        (xs,) = self._Columns([column])
+        valid = ~np.isnan(xs)
+        center = xs[valid].mean() if valid.any() else 0.0
+        ds = np.where(valid, xs - center, 0.0)
+
+        means, variances = [], []
+        for ws in self.Weights():
+            n = ws @ valid
+            with np.errstate(invalid="ignore", divide="ignore"):
+                mean = (ws @ ds) / n
+                ss = ws @ ds**2 - n * mean**2
+                means.append(mean + center)
+                variances.append(ss / (n - ddof))
+        return np.concatenate(means), np.concatenate(variances)
+
+    def LeastSquares(self, xcol, ycol):
+        """Fits a least squares line to each replicate.
+
+        Rows where either value is NaN are skipped.
+
+        xcol: string column name of the explanatory variable
+        ycol: string column name of the dependent variable
+
+        returns: pair of NumPy arrays, (inters, slopes)
+        """
+        xs, ys = self._Columns([xcol, ycol])
+        valid = ~(np.isnan(xs) | np.isnan(ys))
+        cx = xs[valid].mean() if valid.any() else 0.0
+        cy = ys[valid].mean() if valid.any() else 0.0
+        dxs = np.where(valid, xs - cx, 0.0)
+        dys = np.where(valid, ys - cy, 0.0)
+
+        inters, slopes = [], []
+        for ws in self.Weights():
+            n = ws @ valid
+            with np.errstate(invalid="ignore", divide="ignore"):
+                mx = (ws @ dxs) / n
+                my = (ws @ dys) / n
+                sxx = ws @ dxs**2 - n * mx**2
+                sxy = ws @ (dxs * dys) - n * mx * my
+                slope = sxy / sxx
+            slopes.append(slope)
+            inters.append(cy + my - slope * (cx + mx))
+        return np.concatenate(inters), np.concatenate(slopes)
+
+
+class WeightedResampler(object):
+    """Resamples the rows of a DataFrame with probabilities proportional
+    to a weight column, optionally within strata.
+
+    The alias tables are built once, so each resample takes O(n) time
+    with no normalizing or cumulative sums.  With strata, each stratum
+    is resampled to its own size, like grouping by the stratum and
+    calling ResampleRowsWeighted on each group; all strata are drawn
+    in one vectorized step.
+    """
+
+    def __init__(self, df, column="finalwgt", strata=None, seed=None):
+        """Builds the alias tables.
+
+        df: DataFrame
+        column: string column name to use as weights
+        strata: string column name to resample within, like 'year',
+                or None
+        seed: int seed, or None to draw one from np.random, so that
+              RandomSeed makes the results reproducible
+        """
+        self.df = df
+        if seed is None:
+            seed = np.random.randint(2**63, dtype=np.int64)
+        self.rng = np.random.default_rng(seed)
+
+        weights = np.asarray(df[column].values, dtype=float)
+        if strata is None:
+            groups = [np.arange(len(df))]
+        else:
+            codes, _ = pandas.factorize(df[strata], sort=True)
+            order = np.argsort(codes, kind="stable")
+            bounds = np.flatnonzero(np.diff(codes[order])) + 1
+            groups = np.split(order, bounds)
+
+        # rows[i] is a row position; the tables for each stratum
+        # occupy a contiguous block, with aliases offset accordingly
+        self.rows = np.concatenate(groups)
+        self.prob = np.empty(len(df))
+        self.alias = np.empty(len(df), dtype=np.int64)
+        self.starts = np.empty(len(df), dtype=np.int64)
+        self.sizes = np.empty(len(df), dtype=np.int64)
+        start = 0
+        for group in groups:
+            sampler = AliasSampler(group, weights[group])
+            end = start + len(group)
+            self.prob[start:end] = sampler.prob
+            self.alias[start:end] = sampler.alias + start
+            self.starts[start:end] = start
+            self.sizes[start:end] = len(group)
+            start = end
+
+    def Indices(self):
+        """Draws one resample.
+
+        returns: NumPy array of row positions, grouped by stratum
+        """
+        n = len(self.rows)
+        u = self.rng.random(n)
+        offsets = np.minimum((u * self.sizes).astype(np.int64), self.sizes - 1)
+        i = self.starts + offsets
+        keep = self.rng.random(n) < self.prob[i]
+        return self.rows[np.where(keep, i, self.alias[i])]
+
+    def Resample(self, columns=None):
+        """Draws one resampled DataFrame.
+
+        columns: sequence of column names to include, or None for all
+
+        returns: DataFrame
+        """
+        df = self.df if columns is None else self.df[list(columns)]
+        return df.iloc[self.Indices()]
+
+    def Resamples(self, iters, columns=None):
+        """Generates resampled DataFrames.
+
+        iters: number of resamples
+        columns: sequence of column names to include, or None for all
+
+        returns: iterator of DataFrames
+        """
+        for _ in range(iters):
+            yield self.Resample(columns)
+
+
 def PercentileRow(array, p):
     """Selects the row from a sorted array that maps to percentile p.
 
@@ -2973,7 +5641,18 @@ def Smooth(xs, sigma=2, **options):
 
 
 class HypothesisTest(object):
-    """Represents a hypothesis test."""
+    """Represents a hypothesis test.
+
+    Subclasses provide TestStatistic and RunModel.  To simulate many
+    datasets at once, they can also override RunModelBatch, which
+    returns a batch of simulated datasets (often a matrix with one row
+    per dataset), and TestStatisticBatch, which returns an array of test
+    statistics for a batch.  PValue uses the batch hooks, batch_size
+    iterations at a time, when RunModelBatch is overridden.
+    """
+
+    batch_size = 1000
+    chunk_size = 10000
 
     def __init__(self, data):
         """Initializes.
@@ -2985,20 +5664,130 @@ class HypothesisTest(object):
         self.actual = self.TestStatistic(data)
         self.test_stats = None
         self.test_cdf = None
+        self.iters = None
+        self.interval = None
 
-    def PValue(self, iters=1000):
+    def PValue(self, iters=1000, processes=None, seed=None):
         """Computes the distribution of the test statistic and p-value.
 
+        With neither processes nor seed, the simulations use the global
+        random generators, as before.  Otherwise the iterations are split
+        into chunks of chunk_size, and each chunk reseeds the generators
+        from a SeedSequence, so the results for a given seed are the same
+        for any number of processes.
+
         iters: number of iterations
+        processes: number of worker processes; None or 1 runs serially
+        seed: int seed for reproducible results
 
         returns: float p-value
         """
-        self.test_stats = [self.TestStatistic(self.RunModel()) for _ in range(iters)]
+        if processes is None and seed is None:
+            self.test_stats = self._Simulate(iters)
+        else:
+            self.test_stats = self._SimulateChunks(iters, processes, seed)
+
         self.test_cdf = Cdf(self.test_stats)
 
-        count = sum(1 for x in self.test_stats if x >= self.actual)
+        count = np.count_nonzero(self.test_stats >= self.actual)
+        return count / iters
+
+    def PValueAdaptive(
+        self, alpha=0.05, confidence=0.99, min_iters=100, max_iters=10000
+    ):
+        """Computes the p-value with as many iterations as it needs.
+
+        Runs min_iters iterations, then doubles the number of iterations
+        until the Clopper-Pearson interval for the p-value excludes alpha
+        or max_iters is reached.  Afterward, self.iters is the number of
+        iterations used and self.interval is the last interval.
+
+        Because the interval is checked repeatedly, each check uses a
+        Bonferroni-corrected level, 1 - (1 - confidence) / looks, where
+        looks is the largest number of checks.  So the chance that any
+        of the intervals misses the p-value is at most 1 - confidence.
+
+        alpha: significance level to compare with
+        confidence: confidence level of all the intervals together
+        min_iters: number of iterations before the first check
+        max_iters: largest number of iterations
+
+        returns: float p-value
+        """
+        first = min(min_iters, max_iters)
+        looks = 1 + max(0, int(np.ceil(np.log2(max_iters / first))))
+        level = 1 - (1 - confidence) / looks
+
+        test_stats = self._Simulate(first)
+        while True:
+            iters = len(test_stats)
+            count = np.count_nonzero(test_stats >= self.actual)
+            self.interval = ClopperPearson(count, iters, level)
+            low, high = self.interval
+            if low > alpha or high < alpha or iters >= max_iters:
+                break
+            more = self._Simulate(min(iters, max_iters - iters))
+            test_stats = np.concatenate([test_stats, more])
+
+        self.iters = iters
+        self.test_stats = test_stats
+        self.test_cdf = Cdf(test_stats)
         return count / iters
 
+    def _Simulate(self, iters):
+        """Runs the model iters times and computes the test statistics.
+
+        returns: NumPy array of test statistics
+        """
+        if type(self).RunModelBatch is HypothesisTest.RunModelBatch:
+            return np.array(
+                [self.TestStatistic(self.RunModel()) for _ in range(iters)]
+            )
+
+        stats = []
+        for start in range(0, iters, self.batch_size):
+            n = min(self.batch_size, iters - start)
+            stats.append(self.TestStatisticBatch(self.RunModelBatch(n)))
+        return np.concatenate(stats) if stats else np.array([])
+
+    def _SimulateChunks(self, iters, processes=None, seed=None):
+        """Runs the simulations in seeded chunks, maybe in parallel.
+
+        iters: number of iterations
+        processes: number of worker processes
+        seed: int seed; if None, draws one from np.random
+
+        returns: NumPy array of test statistics
+        """
+        if seed is None:
+            seed = np.random.randint(2**31)
+
+        sizes = [
+            min(self.chunk_size, iters - start)
+            for start in range(0, iters, self.chunk_size)
+        ]
+        children = np.random.SeedSequence(seed).spawn(len(sizes))
+        seeds = [int(child.generate_state(1)[0]) for child in children]
+
+        if processes is None or processes <= 1 or len(sizes) <= 1:
+            # the chunks reseed the global generators; put them back after
+            states = random.getstate(), np.random.get_state()
+            try:
+                stats = [
+                    _SimulateChunk(self, n, s) for n, s in zip(sizes, seeds)
+                ]
+            finally:
+                random.setstate(states[0])
+                np.random.set_state(states[1])
+        else:
+            tests = [None] * len(sizes)
+            with ProcessPoolExecutor(
+                processes, initializer=_InitWorker, initargs=(self,)
+            ) as executor:
+                stats = list(executor.map(_SimulateChunk, tests, sizes, seeds))
+
+        return np.concatenate(stats) if stats else np.array([])
+
     def MaxTestStat(self):
         """Returns the largest test statistic seen during simulations."""
         return max(self.test_stats)
@@ -3031,6 +5820,67 @@ class HypothesisTest(object):
         """
         raise UnimplementedMethodException()
 
+    def RunModelBatch(self, n):
+        """Run the model of the null hypothesis n times.
+
+        n: number of simulated datasets
+
+        returns: batch of simulated data that TestStatisticBatch accepts
+        """
+        return [self.RunModel() for _ in range(n)]
+
+    def TestStatisticBatch(self, batch):
+        """Computes the test statistic for a batch of simulated data.
+
+        batch: result from RunModelBatch
+
+        returns: NumPy array of test statistics
+        """
+        return np.array([self.TestStatistic(data) for data in batch])
+
+
+def ClopperPearson(k, n, confidence=0.95):
+    """Computes an exact confidence interval for a binomial proportion.
+
+    k: number of successes
+    n: number of trials
+    confidence: confidence level
+
+    returns: tuple of (low, high)
+    """
+    tail = (1 - confidence) / 2
+    low = float(stats.beta.ppf(tail, k, n - k + 1)) if k > 0 else 0.0
+    high = float(stats.beta.ppf(1 - tail, k + 1, n - k)) if k < n else 1.0
+    return low, high
+
+
+# the HypothesisTest each worker process runs; see _InitWorker
+_worker_test = None
+
+
+def _InitWorker(test):
+    """Stores a HypothesisTest in a worker process.
+
+    test: HypothesisTest
+    """
+    global _worker_test
+    _worker_test = test
+
+
+def _SimulateChunk(test, iters, seed):
+    """Seeds the random generators and runs a chunk of simulations.
+
+    test: HypothesisTest, or None to use the one from _InitWorker
+    iters: number of iterations
+    seed: int seed
+
+    returns: NumPy array of test statistics
+    """
+    if test is None:
+        test = _worker_test
+    RandomSeed(seed)
+    return test._Simulate(iters)
+
 
 def main():
     pass
@@ -7,12 +7,16 @@ License: GNU GPLv3 http://www.gnu.org/licenses/gpl.html
 
 from __future__ import print_function, division
 
+import os
+import tempfile
 import unittest
 import random
 
 from collections import Counter
 import numpy as np
+import pandas
 
+import hypothesis
 import thinkstats2
 import thinkplot
 
@@ -136,6 +140,259 @@ class Test(unittest.TestCase):
         xs, ys = pmf.Render()
         self.assertEqual(tuple(xs), tuple(sorted(pmf.Values())))
 
+    def testHistUpdate(self):
+        t = np.random.randint(0, 20, 1000)
+        series = pandas.Series(t.astype(float))
+        series[::10] = np.nan
+        hist = thinkstats2.Hist(series)
+
+        chunks = (series[i:i+99] for i in range(0, len(series), 99))
+        hist2 = thinkstats2.MakeHistFromChunks(chunks)
+        self.assertEqual(hist, hist2)
+
+        df = pandas.DataFrame(dict(x=series))
+        chunks = (df[i:i+99] for i in range(0, len(df), 99))
+        hist3 = thinkstats2.MakeHistFromChunks(chunks, column='x', array=True)
+        self.assertEqual(dict(hist3.Items()), dict(hist.Items()))
+
+        hist4 = thinkstats2.Hist('allen')
+        hist4.Update('downey')
+        self.assertEqual(hist4, thinkstats2.Hist('allendowney'))
+
+    def testMerge(self):
+        t1 = np.random.randint(0, 30, 500)
+        t2 = np.random.randint(10, 50, 300)
+        t = np.concatenate([t1, t2])
+
+        hist = thinkstats2.Hist(t1)
+        hist.Merge(thinkstats2.Hist(t2))
+        self.assertEqual(hist, thinkstats2.Hist(t))
+
+        cdf = thinkstats2.Cdf(t1).Merge(thinkstats2.Cdf(t2), 500, 300)
+        self.assertTrue(np.allclose(cdf.ps, thinkstats2.Cdf(t).ps))
+
+        arrays = hist.ToArrays()
+        self.assertEqual(thinkstats2.MakeHistFromArrays(**arrays), hist)
+        pmf = thinkstats2.Pmf(hist)
+        self.assertEqual(thinkstats2.MakePmfFromArrays(**pmf.ToArrays()), pmf)
+        cdf2 = thinkstats2.MakeCdfFromArrays(**cdf.ToArrays())
+        self.assertEqual(cdf2, cdf)
+
+        with tempfile.TemporaryDirectory() as dirname:
+            filenames = []
+            for i, ts in enumerate([t1, t2]):
+                filename = os.path.join(dirname, 'part%d.csv' % i)
+                pandas.DataFrame(dict(x=ts)).to_csv(filename, index=False)
+                filenames.append(filename)
+            hist2 = thinkstats2.MakeHistFromFiles(filenames, column='x',
+                                                  processes=2)
+            self.assertRaises(ValueError, thinkstats2.MakeHistFromFiles,
+                              filenames)
+            self.assertRaises(ValueError, thinkstats2.MakeHistFromFiles,
+                              filenames, reader=pandas.read_csv,
+                              processes=1)
+        self.assertEqual(hist2, hist)
+        self.assertRaises(ValueError, hist.Update, pandas.DataFrame(dict(x=t)))
+
+    def testPmfPercentiles(self):
+        t = np.random.randint(0, 100, 1000)
+        for array in [False, True]:
+            pmf = thinkstats2.Pmf(t, array=array)
+            cdf = pmf.MakeCdf()
+            self.assertEqual(pmf.Median(), cdf.Percentile(50))
+            interval = cdf.CredibleInterval(90)
+            self.assertEqual(pmf.CredibleInterval(90), interval)
+            intervals = pmf.CredibleIntervals([50, 90])
+            self.assertEqual(intervals[1], interval)
+            interval = thinkstats2.CredibleInterval(pmf, 50)
+            self.assertEqual(interval, intervals[0])
+            self.assertEqual(pmf.Percentiles([25, 75]),
+                             [pmf.Percentile(25), pmf.Percentile(75)])
+
+            # modifying the Pmf discards the cached index
+            pmf.Set(1000, 10)
+            pmf.Normalize()
+            self.assertEqual(pmf.Median(), 1000)
+
+    def testCdfLookup(self):
+        t = np.random.normal(size=1000)
+        cdf = thinkstats2.Cdf(t)
+        xs = np.append(np.random.normal(size=100), [np.nan, -10, 10])
+        ps = cdf.Probs(xs)
+        for x, p in zip(xs, ps):
+            if np.isnan(x):
+                self.assertTrue(np.isnan(p))
+                self.assertTrue(np.isnan(cdf.Prob(x)))
+            else:
+                self.assertEqual(cdf.Prob(x), p)
+        self.assertEqual(cdf.Probs(-10), 0)
+        self.assertIsInstance(cdf.Prob(-10), float)
+        self.assertEqual(thinkstats2.Cdf().Prob(1), 0)
+
+        series = pandas.Series(xs, index=np.arange(len(xs)) * 2)
+        res = cdf.Lookup(series)
+        self.assertTrue(res.index.equals(series.index))
+        self.assertTrue(np.array_equal(res.values, ps, equal_nan=True))
+
+        self.assertEqual(cdf.Value(0.5), cdf.Values([0.5])[0])
+        self.assertRaises(ValueError, cdf.Value, np.nan)
+
+        # Max makes new arrays, so the cached lists stay valid
+        cdf2 = cdf.Max(2)
+        self.assertAlmostEqual(cdf2.Prob(0), cdf.Prob(0)**2)
+
+    def testCdfCompress(self):
+        t = np.random.normal(size=10000)
+        cdf = thinkstats2.Cdf(t)
+        xs = np.linspace(-3, 3, 101)
+
+        cdf2 = cdf.Compress(max_points=100)
+        self.assertLessEqual(len(cdf2), 100)
+        self.assertEqual(cdf2.ps[-1], 1)
+        errors = cdf2.Probs(xs) - cdf.Probs(xs)
+        self.assertLess(max(abs(errors)), 1 / 98)
+
+        cdf3 = cdf._Round(100)
+        errors = cdf3.Probs(xs) - cdf.Probs(xs)
+        self.assertLess(max(abs(errors)), 0.01)
+
+        cdf4 = cdf.Compress(max_error=0.001)
+        errors = cdf4.Probs(t) - cdf.Probs(t)
+        self.assertLess(max(abs(errors)), 0.001)
+        self.assertEqual(len(cdf.Compress(max_points=len(cdf))), len(cdf))
+
+    def testApproxCdf(self):
+        t = np.random.normal(size=100000)
+        cdf = thinkstats2.Cdf(t)
+        ps = np.linspace(0.01, 0.99, 99)
+
+        approx = thinkstats2.ApproxCdf(k=200, seed=17)
+        for chunk in np.array_split(t, 10):
+            approx.Update(chunk)
+        self.assertEqual(approx.n, len(t))
+        self.assertLess(approx.Size(), 1000)
+        errors = cdf.Probs(approx.Values(ps)) - ps
+        self.assertLess(max(abs(errors)), 0.03)
+        self.assertAlmostEqual(approx.Prob(0), 0.5, delta=0.03)
+
+        approx2 = thinkstats2.ApproxCdf(t[:50000], seed=1)
+        approx2.Merge(thinkstats2.ApproxCdf(t[50000:], seed=2))
+        self.assertEqual(approx2.n, len(t))
+        self.assertAlmostEqual(approx2.Percentile(50), cdf.Percentile(50),
+                               delta=0.1)
+
+        xs, ps = approx.Render()
+        self.assertEqual(len(xs), 2 * len(approx))
+
+    def testColumnStore(self):
+        df = pandas.DataFrame(dict(x=[1.0, 2.0, np.nan, 2.0],
+                                   n=[3, 1, 4, 1],
+                                   s=['a', 'b', 'c', 'd']),
+                              index=[10, 20, 30, 40])
+        with tempfile.TemporaryDirectory() as dirname:
+            thinkstats2.SaveColumns(df, dirname)
+            store = thinkstats2.ColumnStore(dirname)
+            self.assertEqual(len(store), 4)
+            self.assertEqual(store.columns, ['x', 'n', 's'])
+            self.assertIsInstance(store.n, np.memmap)
+            self.assertEqual(list(store['s']), ['a', 'b', 'c', 'd'])
+
+            df2 = store.ToDataFrame()
+            self.assertTrue(df2.equals(df))
+            self.assertTrue(np.shares_memory(df2.n.values, store.n))
+
+            hist = store.MakeHist('x')
+            self.assertEqual(hist[2.0], 2)
+            self.assertEqual(hist.Total(), 3)
+            cdf = store.MakeCdf('n')
+            self.assertEqual(cdf, thinkstats2.Cdf(df.n))
+            self.assertEqual(store.MakePmf('n')[1], 0.5)
+
+            # a stepped RangeIndex is saved, not taken for the default
+            thinkstats2.SaveColumns(df.reset_index(drop=True).iloc[::2],
+                                    dirname)
+            store = thinkstats2.ColumnStore(dirname)
+            self.assertEqual(list(store.index), [0, 2])
+
+    def testFrameCache(self):
+        def MakeFrame(filename):
+            with open(filename) as f:
+                xs = [float(line) for line in f]
+            return pandas.DataFrame(dict(x=xs, label=['a'] * len(xs)))
+
+        with tempfile.TemporaryDirectory() as dirname:
+            filename = os.path.join(dirname, 'data.txt')
+            with open(filename, 'w') as f:
+                f.write('1\n2\n3\n')
+
+            cache = thinkstats2.FrameCache(os.path.join(dirname, 'cache'))
+            df1 = cache.Read(MakeFrame, [filename], args=(filename,))
+            df2 = cache.Read(MakeFrame, [filename], args=(filename,))
+            self.assertTrue(df1.equals(df2))
+            self.assertIsInstance(df2.x.values, np.memmap)
+            self.assertEqual(len(cache.Entries()), 1)
+
+            # changing the data changes the key
+            with open(filename, 'a') as f:
+                f.write('4\n')
+            df3 = cache.Read(MakeFrame, [filename], args=(filename,))
+            self.assertEqual(len(df3), 4)
+            self.assertEqual(len(cache.Entries()), 2)
+
+            cache.Invalidate(MakeFrame)
+            self.assertEqual(len(cache.Entries()), 0)
+
+    def testArrayPmf(self):
+        t = [1, 2, 2, 3, 5, 5, 5, 9]
+        pmf = thinkstats2.Pmf(t)
+        apmf = thinkstats2.Pmf(t, array=True)
+        self.assertTrue(apmf.IsArray())
+        self.assertEqual(pmf, apmf)
+        self.assertEqual(str(pmf), str(apmf))
+
+        self.assertAlmostEqual(apmf.Mean(), pmf.Mean())
+        self.assertAlmostEqual(apmf.Var(), pmf.Var())
+        self.assertAlmostEqual(apmf.Total(), 1)
+        self.assertEqual(apmf.Mode(), pmf.Mode())
+        self.assertEqual(apmf.Percentile(50), pmf.Percentile(50))
+        self.assertEqual(apmf.ProbLess(5), pmf.ProbLess(5))
+        self.assertEqual(apmf.ProbGreater(2), pmf.ProbGreater(2))
+
+        apmf[4] = 0.5
+        self.assertEqual(apmf[4], 0.5)
+        self.assertEqual(list(apmf.Values()), [1, 2, 3, 4, 5, 9])
+        apmf.Normalize()
+        self.assertAlmostEqual(apmf.Total(), 1)
+        apmf.Remove(4)
+        self.assertFalse(4 in apmf)
+        self.assertEqual(apmf['missing'], 0)
+
+        hist = thinkstats2.Hist('allen', array=True)
+        self.assertEqual(hist, thinkstats2.Hist('allen'))
+        self.assertEqual(hist.Freq('l'), 2)
+        hist.Incr('l')
+        self.assertEqual(hist.Freq('l'), 3)
+
+        cdf = thinkstats2.Cdf(thinkstats2.Pmf(t, array=True))
+        self.assertEqual(cdf, thinkstats2.Cdf(t))
+
+    def testArrayStorageNotShared(self):
+        hist = thinkstats2.Hist([1, 2, 2], array=True)
+        hist2 = hist.Scale(2)
+        hist2[2] = 100
+        self.assertEqual(hist.Items(), [(1, 1), (2, 2)])
+
+        xs = np.array([1.0, 2.0])
+        ps = np.array([0.25, 0.75])
+        pmf = thinkstats2.MakePmfFromArrays(xs, ps, array=True)
+        pmf[2.0] = 0.9
+        self.assertEqual(list(ps), [0.25, 0.75])
+
+        ps.setflags(write=False)
+        pmf = thinkstats2.MakePmfFromArrays(xs, ps, array=True)
+        pmf[2.0] = 0.9
+        self.assertEqual(pmf[2.0], 0.9)
+
     def testSortedItems(self):
         pmf = thinkstats2.Pmf('allen')
         items = pmf.SortedItems()
@@ -161,6 +418,15 @@ class Test(unittest.TestCase):
         pmf4 = pmf - pmf
         self.assertAlmostEqual(pmf4.Mean(), 0)
 
+        # small int types don't wrap around
+        t = pandas.Series([100, 120], dtype=np.int8)
+        apmf = thinkstats2.Pmf(t, array=True)
+        self.assertEqual((apmf + apmf).Values(), [200, 220, 240])
+        self.assertEqual(apmf.Scale(2).Values(), [200, 240])
+        self.assertEqual(apmf.SumOf(3).Values()[-1], 360)
+        upmf = thinkstats2.Pmf(np.array([1, 5], dtype=np.uint8), array=True)
+        self.assertEqual((upmf - upmf).Values(), [-4, 0, 4])
+
     def testPmfMulDiv(self):
         pmf = thinkstats2.Pmf([1, 2, 3, 4, 5, 6])
 
@@ -176,6 +442,224 @@ class Test(unittest.TestCase):
         pmf4 = pmf / pmf
         self.assertAlmostEqual(pmf4.Mean(), 1.4291667)
 
+    def testPmfConvolve(self):
+        pmf1 = thinkstats2.Pmf([1, 2, 2, 5, 11])
+        pmf2 = thinkstats2.Pmf([0, 3, 30, 31])
+        expected = thinkstats2.Pmf()
+        for v1, p1 in pmf1.Items():
+            for v2, p2 in pmf2.Items():
+                expected.Incr(v1 + v2, p1 * p2)
+
+        pmf3 = pmf1 + pmf2
+        self.assertEqual(sorted(pmf3.Values()), sorted(expected.Values()))
+        for x in expected.Values():
+            self.assertAlmostEqual(pmf3[x], expected[x])
+
+        d6 = thinkstats2.Pmf(range(1, 7))
+        three = d6 + d6 + d6
+        pmf = d6.SumOf(3)
+        self.assertEqual(len(pmf), len(three))
+        for x in three.Values():
+            self.assertAlmostEqual(pmf[x], three[x])
+        self.assertAlmostEqual(d6.SumOf(100).Mean(), 350)
+
+        meta = thinkstats2.Pmf({d6: 0.5, thinkstats2.Pmf([10, 20]): 0.5})
+        mix = thinkstats2.MakeMixture(meta)
+        self.assertAlmostEqual(mix[1], 1 / 12)
+        self.assertAlmostEqual(mix[10], 0.25)
+        self.assertAlmostEqual(mix.Total(), 1)
+
+    def testPmfSample(self):
+        pmf = thinkstats2.Pmf(dict(a=0.2, b=0.5, c=0.3))
+        sampler = pmf.Sampler()
+        self.assertIs(pmf.Sampler(), sampler)
+
+        xs = pmf.Sample(10, np.random.default_rng(17))
+        ys = pmf.Sample(10, np.random.default_rng(17))
+        self.assertListEqual(xs.tolist(), ys.tolist())
+
+        hist = thinkstats2.Hist(pmf.Sample(100000, np.random.default_rng(17)))
+        self.assertAlmostEqual(hist['b'] / 100000, 0.5, places=2)
+        self.assertIn(pmf.Random(), 'abc')
+
+        dice = thinkstats2.Pmf([1, 2, 3, 4, 5, 6])
+        sums = thinkstats2.SampleSum([dice, dice], 1000)
+        self.assertTrue(set(sums.Values()) <= set(range(2, 13)))
+        self.assertEqual(thinkstats2.SampleSum([], 10), thinkstats2.Pmf([0]))
+
+        # modifying the Pmf discards the sampler
+        pmf['c'] = 0
+        self.assertIsNot(pmf.Sampler(), sampler)
+        xs = pmf.Sample(1000)
+        self.assertNotIn('c', xs)
+
+        # the tables reproduce the distribution exactly, including
+        # integer weights with many ties and zeros
+        ps = np.random.exponential(size=1000)
+        ps[::7] = 0
+        tied = [3, 2, 1, 3, 3, 1, 3, 2, 3, 1, 1, 0, 3, 1, 3, 0, 1, 2,
+                1, 0, 3, 0, 2, 3, 0, 2, 3, 3, 0, 2, 1, 0, 3, 2, 1, 1]
+        for ps in [ps, np.array(tied, dtype=float),
+                   np.random.randint(0, 4, size=500).astype(float)]:
+            sampler = thinkstats2.AliasSampler(range(len(ps)), ps)
+            implied = sampler.prob.copy()
+            np.add.at(implied, sampler.alias, 1 - sampler.prob)
+            self.assertTrue(np.allclose(implied / len(ps), ps / ps.sum(),
+                                        rtol=0, atol=1e-12))
+
+        # mixed-type keys come back as the keys themselves
+        pmf = thinkstats2.Pmf({1: 0.5, 'a': 0.5})
+        for _ in range(20):
+            x = pmf.Random()
+            self.assertIn(x, pmf)
+            self.assertIn(type(x), (int, str))
+        self.assertTrue(set(pmf.Sample(20)) <= set([1, 'a']))
+
+    def testSuiteArrayUpdate(self):
+        # the same coin-bias suite, with one likelihood at a time,
+        # likelihoods for all hypotheses, and log likelihoods of a dataset
+        class Euro(thinkstats2.Suite):
+            def Likelihood(self, data, hypo):
+                x = hypo / 100
+                return x if data == 'H' else 1 - x
+
+        class EuroArray(thinkstats2.Suite):
+            def Likelihoods(self, data, hypos):
+                x = hypos / 100
+                return x if data == 'H' else 1 - x
+
+        class EuroLog(thinkstats2.Suite):
+            def LogLikelihoods(self, dataset, hypos):
+                x = hypos / 100
+                heads = dataset.count('H')
+                tails = len(dataset) - heads
+                with np.errstate(divide='ignore'):
+                    return heads * np.log(x) + tails * np.log(1 - x)
+
+        dataset = 'H' * 140 + 'T' * 110
+        suite = Euro(range(101))
+        total = suite.UpdateSet(dataset)
+
+        for cls, array in [(EuroArray, False), (EuroLog, False),
+                           (EuroArray, True), (EuroLog, True)]:
+            suite2 = cls(range(101), array=array)
+            total2 = suite2.UpdateSet(dataset)
+            self.assertAlmostEqual(total2 / total, 1)
+            self.assertAlmostEqual(suite2.Mean(), suite.Mean())
+            self.assertEqual(suite2.MAP(), suite.MAP())
+            self.assertAlmostEqual(suite2[50], suite[50])
+
+        suite = Euro(range(101))
+        suite.Update('H')
+        suite2 = EuroArray(range(101))
+        suite2.Update('H')
+        self.assertAlmostEqual(suite2.Mean(), suite.Mean())
+
+        # a long dataset underflows without log space
+        suite = EuroLog(range(101), array=True)
+        suite.UpdateSet(dataset * 100)
+        self.assertEqual(suite.MAP(), 56)
+
+    def testGridJoint(self):
+        pmf1 = thinkstats2.Pmf([1, 2, 2, 3])
+        pmf2 = thinkstats2.Pmf([10, 20, 20, 20])
+        joint = thinkstats2.MakeJoint(pmf1, pmf2)
+        grid = thinkstats2.MakeGridJoint(pmf1, pmf2)
+        self.assertEqual(grid.ps.shape, (3, 2))
+        self.assertAlmostEqual(grid.Total(), 1)
+        self.assertAlmostEqual(grid[2, 20], joint[2, 20])
+
+        for i in range(2):
+            m1 = grid.Marginal(i)
+            m2 = joint.Marginal(i)
+            for x in m2:
+                self.assertAlmostEqual(m1[x], m2[x])
+
+        c1 = grid.Conditional(0, 1, 10)
+        c2 = joint.Conditional(0, 1, 10)
+        for x in c2:
+            self.assertAlmostEqual(c1[x], c2[x])
+
+        self.assertEqual(sorted(grid.MaxLikeInterval(50)),
+                         sorted(joint.MaxLikeInterval(50)))
+
+        # round trip through Joint
+        grid2 = joint.MakeGridJoint()
+        self.assertTrue(np.allclose(grid2.ps, grid.ps))
+        joint2 = grid2.MakeJoint()
+        self.assertAlmostEqual(joint2[3, 10], joint[3, 10])
+
+        grid3 = thinkstats2.MakeGridJoint(pmf1, pmf2, pmf1)
+        cond = grid3.Conditional(2, 0, 1)
+        self.assertAlmostEqual(cond[2], 0.5)
+
+    def testPValue(self):
+        # a module-level test, so it can be sent to worker processes
+        ct = hypothesis.CoinTest((140, 110))
+        thinkstats2.RandomSeed(17)
+        p1 = ct.PValue(1000)
+        thinkstats2.RandomSeed(17)
+        p2 = ct.PValue(1000)
+        self.assertEqual(p1, p2)
+        self.assertEqual(len(ct.test_stats), 1000)
+
+        # seeded results do not depend on the number of processes
+        ct.chunk_size = 500
+        p3 = ct.PValue(2000, seed=1)
+        stats = ct.test_stats
+        p4 = ct.PValue(2000, processes=2, seed=1)
+        self.assertEqual(p3, p4)
+        self.assertTrue(np.array_equal(stats, ct.test_stats))
+
+        # a seeded serial run leaves the global generators alone
+        np.random.seed(5)
+        random.seed(5)
+        expected = np.random.random(), random.random()
+        np.random.seed(5)
+        random.seed(5)
+        ct.PValue(100, seed=3)
+        self.assertEqual((np.random.random(), random.random()), expected)
+
+        class CoinTestBatch(hypothesis.CoinTest):
+            def RunModelBatch(self, n):
+                heads, tails = self.data
+                return np.random.binomial(heads + tails, 0.5, size=n)
+
+            def TestStatisticBatch(self, batch):
+                heads, tails = self.data
+                return np.abs(2 * batch - (heads + tails))
+
+        ctb = CoinTestBatch((140, 110))
+        ctb.batch_size = 300
+        p5 = ctb.PValue(20000, seed=1)
+        self.assertEqual(len(ctb.test_stats), 20000)
+        self.assertAlmostEqual(p5, p3, delta=0.02)
+
+        # a clear result stops after the first check
+        ct = CoinTestBatch((200, 100))
+        p_value = ct.PValueAdaptive(alpha=0.05, min_iters=200)
+        self.assertEqual(ct.iters, 200)
+        self.assertEqual(len(ct.test_stats), 200)
+        self.assertLess(ct.interval[1], 0.05)
+        self.assertEqual(p_value, 0)
+
+        ct = CoinTestBatch((140, 110))
+        ct.PValueAdaptive(alpha=0.06, min_iters=100, max_iters=500)
+        self.assertLessEqual(ct.iters, 500)
+
+        # with checks at 100, 200, 400 and 500 iterations, each interval
+        # has a quarter of the error rate
+        ct = CoinTestBatch((125, 125))
+        ct.PValueAdaptive(alpha=0.05, confidence=0.99, min_iters=100,
+                          max_iters=500)
+        count = np.count_nonzero(ct.test_stats >= ct.actual)
+        interval = thinkstats2.ClopperPearson(count, ct.iters, 1 - 0.01 / 4)
+        self.assertEqual(ct.interval, interval)
+
+        low, high = thinkstats2.ClopperPearson(5, 10)
+        self.assertAlmostEqual(low, 0.187086, places=5)
+        self.assertAlmostEqual(high, 0.812914, places=5)
+
     def testPmfProbLess(self):
         d6 = thinkstats2.Pmf(range(1,7))
         self.assertEqual(d6.ProbLess(4), 0.5)
@@ -185,6 +669,19 @@ class Test(unittest.TestCase):
         # Pmf no longer supports magic comparators
         self.assertAlmostEqual(two.ProbGreater(three), 0.15200617284)
         self.assertAlmostEqual(two.ProbLess(three), 0.778549382716049)
+        self.assertAlmostEqual(thinkstats2.PmfProbEqual(two, three),
+                               1 - 0.15200617284 - 0.778549382716049)
+
+        ps = thinkstats2.PmfProbLessArray(two, [three, d6, two])
+        self.assertEqual(len(ps), 3)
+        self.assertAlmostEqual(ps[0], two.ProbLess(three))
+        self.assertAlmostEqual(ps[1], two.ProbLess(d6))
+        self.assertAlmostEqual(ps[2], two.ProbLess(two))
+
+        ps = thinkstats2.PmfProbGreaterArray(two, [three, d6])
+        self.assertAlmostEqual(ps[0], two.ProbGreater(three))
+        ps = thinkstats2.PmfProbEqualArray(d6, [d6])
+        self.assertAlmostEqual(ps[0], 1 / 6)
 
     def testPmfMax(self):
         d6 = thinkstats2.Pmf(range(1,7))
@@ -402,7 +899,75 @@ class Test(unittest.TestCase):
         
         self.assertAlmostEqual(thinkstats2.SpearmanCorr(t, -a), -1)
         self.assertAlmostEqual(thinkstats2.SpearmanCorr(t, t2), -0.1878787878)
-        
+
+    def testRunningMeanVar(self):
+        xs = np.random.normal(1e6, 3, size=1000)
+        stat = thinkstats2.RunningMeanVar()
+        for chunk in np.array_split(xs, 7):
+            stat.Update(chunk)
+        mean, var = thinkstats2.MeanVar(xs)
+        self.assertEqual(stat.n, 1000)
+        self.assertAlmostEqual(stat.Mean(), mean)
+        self.assertAlmostEqual(stat.Var(), var)
+        self.assertAlmostEqual(stat.Var(ddof=1), np.var(xs, ddof=1))
+
+        stat1 = thinkstats2.RunningMeanVar(xs[:300])
+        stat1.Merge(thinkstats2.RunningMeanVar(list(xs[300:]) + [np.nan]))
+        self.assertEqual(stat1.n, 1000)
+        self.assertAlmostEqual(stat1.Var(), var)
+        self.assertTrue(np.isnan(thinkstats2.RunningMeanVar().Mean()))
+
+    def testBootstrap(self):
+        df = pandas.DataFrame(dict(x=np.arange(20.0), w=np.ones(20)))
+        df['y'] = 3 + 2 * df.x
+        df.loc[5, 'y'] = np.nan
+        bootstrap = thinkstats2.Bootstrap(df, iters=7, seed=17, max_bytes=1000)
+        self.assertEqual(bootstrap.ChunkSize(), 3)
+
+        indices = np.concatenate(list(bootstrap.Indices()))
+        self.assertEqual(indices.shape, (7, 20))
+        means = bootstrap.Mean('y')
+        for i, row in enumerate(indices):
+            self.assertAlmostEqual(means[i], df.y.iloc[row].mean())
+
+        counts = np.concatenate(list(bootstrap.Counts()))
+        self.assertTrue(np.all(counts.sum(axis=1) == 20))
+
+        inters, slopes = bootstrap.LeastSquares('x', 'y')
+        self.assertTrue(np.allclose(inters, 3))
+        self.assertTrue(np.allclose(slopes, 2))
+
+        samples = list(bootstrap.Samples(['x']))
+        self.assertEqual(len(samples), 7)
+        self.assertEqual(list(samples[0].columns), ['x'])
+
+        weighted = thinkstats2.Bootstrap(df, iters=3, weights='w', seed=1)
+        self.assertEqual(len(weighted.Var('x', ddof=1)), 3)
+
+        for method in ['poisson', 'bayes']:
+            bootstrap = thinkstats2.Bootstrap(df, iters=5, weights='w',
+                                              method=method, seed=1)
+            ws = np.concatenate(list(bootstrap.Weights()))
+            self.assertEqual(ws.shape, (5, 20))
+            inters, slopes = bootstrap.LeastSquares('x', 'y')
+            self.assertTrue(np.allclose(slopes, 2))
+            self.assertRaises(ValueError, next, bootstrap.Indices())
+
+    def testWeightedResampler(self):
+        df = pandas.DataFrame(dict(year=[1, 1, 1, 2, 2],
+                                   w=[1.0, 0.0, 0.0, 0.0, 2.0],
+                                   x=range(5)))
+        resampler = thinkstats2.WeightedResampler(df, 'w', strata='year',
+                                                  seed=17)
+        for sample in resampler.Resamples(3, columns=['x']):
+            self.assertEqual(list(sample.x), [0, 0, 0, 4, 4])
+
+        resampler = thinkstats2.WeightedResampler(df, 'w', seed=17)
+        resampler2 = thinkstats2.WeightedResampler(df, 'w', seed=17)
+        indices = resampler.Indices()
+        self.assertTrue(np.array_equal(indices, resampler2.Indices()))
+        self.assertTrue(set(indices) <= set([0, 4]))
+
     def testReadStataDct(self):
         dct = thinkstats2.ReadStataDct('2002FemPreg.dct')
         self.assertEqual(len(dct.variables), 243)
@@ -412,6 +977,49 @@ class Test(unittest.TestCase):
         # TODO: This fails now; investigate what changed
         # self.assertEqual(dct.colspecs[-1][1], -1)
 
+        self.assertEqual(dct.variables.dtype[1], np.int8)
+        self.assertEqual(dct.variables.width[0], 12)
+
+    def testReadFixedWidthFast(self):
+        dct = thinkstats2.ReadStataDct('2002FemPreg.dct')
+        cols = ['caseid', 'prglngth', 'birthwgt_lb', 'agepreg', 'finalwgt']
+        df1 = dct.ReadFixedWidth('2002FemPreg.dat.gz', compression='gzip',
+                                 nrows=500, usecols=cols)
+        df2 = dct.ReadFixedWidthFast('2002FemPreg.dat.gz', usecols=cols,
+                                     nrows=500)
+        self.assertEqual(list(df2.columns), list(df1.columns))
+        self.assertEqual(len(df2), 500)
+        self.assertEqual(df2.prglngth.dtype, np.int8)
+        self.assertEqual(df2.finalwgt.dtype, np.float64)
+        self.assertEqual(df2.caseid[0], str(df1.caseid[0]))
+        for col in cols[1:]:
+            self.assertTrue(np.allclose(df1[col], df2[col], equal_nan=True))
+
+        # float columns keep all the digits in the file
+        dct = thinkstats2.ReadStataDct('2002FemResp.dct',
+                                       encoding='iso-8859-1')
+        cols = ['basewgt', 'finalwgt']
+        df1 = dct.ReadFixedWidth('2002FemResp.dat.gz', compression='gzip',
+                                 nrows=500, usecols=cols)
+        df2 = dct.ReadFixedWidthFast('2002FemResp.dat.gz', usecols=cols,
+                                     nrows=500)
+        for col in cols:
+            self.assertEqual(df2[col].dtype, np.float64)
+            self.assertTrue(np.allclose(df1[col], df2[col], rtol=1e-14))
+
+    def testReadByteMatrix(self):
+        with tempfile.TemporaryDirectory() as dirname:
+            filename = os.path.join(dirname, 'lines.txt')
+            for data in [b'1234\n5678\n9012\n', b'1234\n5678\n9012',
+                         b'1234\r\n5678\r\n9012\r\n', b'1234\n56\n9012']:
+                with open(filename, 'wb') as f:
+                    f.write(data)
+                matrix = thinkstats2._ReadByteMatrix(filename)
+                self.assertEqual(matrix.shape, (3, 4))
+                self.assertEqual(matrix[2].tobytes(), b'9012')
+
+            self.assertEqual(matrix[1].tobytes(), b'56  ')
+
     def testCdfProbs(self):
         t = [-1, 1, 2, 2, 3, 5]
         cdf = thinkstats2.Cdf(t)